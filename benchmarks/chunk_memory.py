@@ -0,0 +1,110 @@
+"""
+Memory benchmark for the chunk representations used during ingestion.
+
+Compares the previous layout (plain dataclasses, per-chunk metadata dict
+repeating the ingestion fields, embeddings as ``List[float]``) with the
+current one (slotted dataclasses, shared ``IngestionContext``, embeddings
+as ``array('f')``).
+
+Objects are uniform, so a sample is measured with ``tracemalloc`` and
+projected linearly to the target ingestion size.
+
+Usage:
+    python -m benchmarks.chunk_memory --chunks 100000 --sample 2000
+"""
+
+import argparse
+import random
+import tracemalloc
+import uuid
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from src.ai.rag.models import DocumentChunk, DocumentChunkEmbedding, IngestionContext
+
+
+@dataclass
+class _LegacyDocumentChunk:
+    content: str
+    source: str
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class _LegacyDocumentChunkEmbedding:
+    document_chunk: _LegacyDocumentChunk
+    embedding: List[float]
+
+
+def _build_legacy(n: int, dimension: int, content: str) -> list:
+    ingestion_id = uuid.uuid4()
+    ingested_at = datetime.now()
+    return [
+        _LegacyDocumentChunkEmbedding(
+            document_chunk=_LegacyDocumentChunk(
+                content=content,
+                source="docs/file.md",
+                metadata={"chunk_index": i, "ingestion_id": ingestion_id, "ingested_at": ingested_at},
+            ),
+            embedding=[random.random() for _ in range(dimension)],
+        )
+        for i in range(n)
+    ]
+
+
+def _build_compact(n: int, dimension: int, content: str) -> list:
+    ingestion = IngestionContext(uuid.uuid4(), datetime.now())
+    return [
+        DocumentChunkEmbedding(
+            document_chunk=DocumentChunk(
+                content=content,
+                source="docs/file.md",
+                metadata={"chunk_index": i},
+                ingestion=ingestion,
+            ),
+            embedding=array("f", (random.random() for _ in range(dimension))),
+        )
+        for i in range(n)
+    ]
+
+
+def _measure(builder: Callable[[int, int, str], list], n: int, dimension: int, content: str) -> int:
+    """Returns the bytes still allocated after building ``n`` chunks."""
+
+    tracemalloc.start()
+    try:
+        objects = builder(n, dimension, content)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000, help="Ingestion size to project to")
+    parser.add_argument("--sample", type=int, default=2_000, help="Number of chunks actually allocated")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args()
+
+    # Chunk text is shared between layouts and excluded from the comparison
+    content = "x" * 500
+
+    results = {}
+    for name, builder in (("legacy", _build_legacy), ("compact", _build_compact)):
+        sample_bytes = _measure(builder, args.sample, args.dimension, content)
+        per_chunk = sample_bytes / args.sample
+        results[name] = per_chunk
+        print(
+            f"{name:>8}: {per_chunk:10.0f} B/chunk | "
+            f"{per_chunk * args.chunks / 1024 ** 3:6.2f} GiB for {args.chunks} chunks"
+        )
+
+    print(f"   ratio: {results['legacy'] / results['compact']:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
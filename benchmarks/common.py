@@ -0,0 +1,80 @@
+"""Helpers shared by the benchmarks: latency summaries and result files."""
+
+import json
+import math
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def latency_summary(latencies: List[float], wall_seconds: Optional[float] = None) -> Dict[str, float]:
+    """
+    Summarizes per-call latencies (seconds) in milliseconds.
+
+    QPS is computed from ``wall_seconds`` when given (concurrent runs),
+    otherwise from the sum of the latencies (sequential runs).
+    """
+
+    values = sorted(latencies)
+    total = wall_seconds if wall_seconds is not None else sum(values)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "qps": round(len(values) / total, 2) if total else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[Path] = None) -> Path:
+    """Writes results as JSON, by default to benchmarks/results/<name>-<commit>.json."""
+
+    commit = git_commit()
+    payload = {
+        "benchmark": name,
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        **results,
+    }
+    if output is None:
+        output = RESULTS_DIR / f"{name}-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2))
+    return output
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], prefix: str = "") -> List[str]:
+    """Lines describing how each numeric metric changed against a baseline result file."""
+
+    lines = []
+    for key, value in current.items():
+        other = baseline.get(key)
+        if isinstance(value, dict) and isinstance(other, dict):
+            lines.extend(compare_results(value, other, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and isinstance(other, (int, float)) and not isinstance(value, bool):
+            change = f"{(value - other) / other * 100:+.1f}%" if other else "n/a"
+            lines.append(f"{prefix}{key}: {other} -> {value} ({change})")
+    return lines
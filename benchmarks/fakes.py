@@ -0,0 +1,53 @@
+"""
+Deterministic stand-in for the OpenAI chat client, so benchmarks run offline.
+
+Chat completions return a fixed answer after an optional simulated
+latency. Embeddings come from HashingEmbeddingProvider instead.
+"""
+
+import time
+import uuid
+from types import SimpleNamespace
+
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from openai.types.completion_usage import CompletionUsage
+
+from src.ai.rag.models import AnswerEvaluation
+
+
+class _FakeCompletions:
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    def create(self, model: str, messages: list, **kwargs):
+        time.sleep(self.latency_seconds)
+        prompt_tokens = sum(len(message["content"].split()) for message in messages)
+        return ChatCompletion(
+            id=f"chatcmpl-{uuid.uuid4().hex}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=model,
+            choices=[Choice(
+                index=0,
+                finish_reason="stop",
+                message=ChatCompletionMessage(role="assistant", content="Synthetic answer."),
+            )],
+            usage=CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=2, total_tokens=prompt_tokens + 2),
+        )
+
+    def parse(self, model: str, messages: list, response_format, **kwargs):
+        time.sleep(self.latency_seconds)
+        parsed = AnswerEvaluation(grounded=True, sufficient_context=True, confidence_alignment=True)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0),
+        )
+
+
+class FakeOpenAI:
+    """Implements the subset of the OpenAI client used by the RAG components."""
+
+    def __init__(self, llm_latency_seconds: float = 0.0):
+        self.chat = SimpleNamespace(completions=_FakeCompletions(llm_latency_seconds))
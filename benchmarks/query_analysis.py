@@ -0,0 +1,176 @@
+"""
+Query decomposition benchmark.
+
+Runs a labelled query set through the previous analyzer (split on every
+"?" and every " and "), the current analyzer, and the current analyzer
+followed by near-duplicate merging. For each it reports:
+- the average number of sub-queries (retrievals) per query
+- how often the number of sub-queries matches the label
+- analysis latency, cold and memoized
+- the estimated retrieval time per query and the time saved against the
+  previous analyzer
+
+Sub-queries are embedded with the deterministic HashingEmbeddingProvider
+and each vector search is charged --search-ms, so no network or database
+is needed. Take --search-ms from the db_search timings of a real run.
+Hashed n-grams barely tell paraphrases from related questions, so merging
+rarely fires with them; pass --configured-embeddings to measure it with
+the provider configured by RAG_EMBEDDING_PROVIDER.
+
+Usage:
+    python -m benchmarks.query_analysis --search-ms 4 --merge-similarity 0.9
+    python -m benchmarks.query_analysis --baseline benchmarks/results/query_analysis-abc1234.json
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import compare_results, latency_summary, write_results
+from src.ai.rag.embeddings import EmbeddingProvider, HashingEmbeddingProvider, get_embedding_provider
+from src.ai.rag.query_analyzer import _analyze, generate_sub_queries, merge_near_duplicates
+
+# (query, number of distinct questions it asks)
+LABELLED_QUERIES: List[Tuple[str, int]] = [
+    ("What is a vector database?", 1),
+    ("What are the pros and cons of pgvector?", 1),
+    ("Compare FastAPI and Flask", 1),
+    ("How do chunking and embedding work together?", 1),
+    ("What are the differences between HNSW and IVFFlat indexes?", 1),
+    ("Explain input and output types in BAML", 1),
+    ("What are the advantages and disadvantages of async endpoints?", 1),
+    ("How do I install and configure the CLI?", 1),
+    ("What is the difference between retries and fallbacks?", 1),
+    ("List the supported clients and providers", 1),
+    ("What are best practices for prompts and schemas?", 1),
+    ("How are requests and responses logged?", 1),
+    ("What is FastAPI and why use it?", 2),
+    ("What is RAG? How does it work? Why is it useful?", 3),
+    ("Explain vector databases and how do they store embeddings?", 2),
+    ("What is LangChain and what are its features and how to install it?", 3),
+    ("What is BAML, how does it parse outputs?", 2),
+    ("What is a retry policy; how do I configure one?", 2),
+    ("How do I deploy the API and what does it cost to run?", 2),
+    ("What is pgvector? What's pgvector?", 1),
+    ("How does streaming work? How does streaming work in BAML?", 2),
+    ("What is an embedding and how is it different from a token?", 2),
+    ("Describe the ingestion pipeline and explain how retention works", 2),
+    ("What is cosine distance and when should I use inner product instead?", 2),
+    ("Which models are supported and can I add my own?", 2),
+    ("Why is my query slow and how can I make it faster?", 2),
+    ("What is tracing? What are spans and traces?", 2),
+    ("What is the admission queue and how are requests rejected?", 2),
+    # Introductory phrases before a comma are context, not a separate question
+    ("In FastAPI, how do I add middleware?", 1),
+    ("For pgvector, which index should I use?", 1),
+    ("If I use BAML, what does a retry cost?", 1),
+    ("In BAML, what is a client, and how do I configure retries?", 2),
+]
+
+
+def _legacy_sub_queries(query: str) -> List[str]:
+    """The previous analyzer: split on every question mark, else on every " and "."""
+
+    query = query.strip()
+    if query.count("?") > 1:
+        return [part.strip() + "?" for part in query.split("?") if part.strip()]
+    parts = [part.strip() for part in re.split(r"\s+and\s+", query, flags=re.IGNORECASE) if part.strip()]
+    if len(parts) > 1:
+        return [part[0].upper() + part[1:] + ("" if part.endswith("?") else "?") for part in parts]
+    return [query]
+
+
+def bench_analyzer(
+    name: str,
+    analyze: Callable[[str], List[str]],
+    embedding_provider: EmbeddingProvider,
+    search_seconds: float,
+    merge_similarity: Optional[float] = None,
+    repeats: int = 20,
+    clear_cache: Optional[Callable[[], None]] = None,
+) -> Dict:
+    cold, warm = [], []
+    searches, exact, retrieval_seconds = [], 0, 0.0
+
+    for query, expected in LABELLED_QUERIES:
+        if clear_cache:
+            clear_cache()
+        start = time.perf_counter()
+        sub_queries = analyze(query)
+        cold.append(time.perf_counter() - start)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            analyze(query)
+            warm.append(time.perf_counter() - start)
+
+        # Retrieval cost: one embedding request, then one search per searched sub-query
+        start = time.perf_counter()
+        embeddings = embedding_provider.embed(sub_queries)
+        searched = len(sub_queries)
+        if merge_similarity is not None:
+            searched = len(set(merge_near_duplicates(embeddings, merge_similarity)))
+        retrieval_seconds += time.perf_counter() - start + searched * search_seconds
+
+        searches.append(searched)
+        exact += searched == expected
+
+    return {
+        "analyzer": name,
+        "avg_sub_queries": round(sum(searches) / len(searches), 3),
+        "label_accuracy": round(exact / len(LABELLED_QUERIES), 4),
+        "analysis_cold": latency_summary(cold),
+        "analysis_memoized": latency_summary(warm),
+        "retrieval_ms_per_query": round(retrieval_seconds / len(LABELLED_QUERIES) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--search-ms", type=float, default=4.0, help="Charged latency of one vector search")
+    parser.add_argument("--merge-similarity", type=float, default=0.9, help="Cosine similarity for merging sub-queries")
+    parser.add_argument("--configured-embeddings", action="store_true", help="Embed with the configured provider")
+    parser.add_argument("--repeats", type=int, default=20, help="Memoized analyses timed per query")
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/query_analysis-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    embedding_provider = get_embedding_provider() if args.configured_embeddings else HashingEmbeddingProvider()
+    search_seconds = args.search_ms / 1000
+    runs = {
+        "legacy": bench_analyzer(
+            "legacy", _legacy_sub_queries, embedding_provider, search_seconds, repeats=args.repeats
+        ),
+        "current": bench_analyzer(
+            "current", generate_sub_queries, embedding_provider, search_seconds,
+            repeats=args.repeats, clear_cache=_analyze.cache_clear
+        ),
+        "current_merged": bench_analyzer(
+            "current_merged", generate_sub_queries, embedding_provider, search_seconds,
+            merge_similarity=args.merge_similarity, repeats=args.repeats, clear_cache=_analyze.cache_clear
+        ),
+    }
+    for run in ("current", "current_merged"):
+        runs[run]["retrieval_ms_saved_per_query"] = round(
+            runs["legacy"]["retrieval_ms_per_query"] - runs[run]["retrieval_ms_per_query"], 3
+        )
+
+    results = {
+        "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "queries": len(LABELLED_QUERIES),
+        **runs,
+    }
+    output = write_results("query_analysis", results, args.output)
+    print(json.dumps({key: value for key, value in results.items() if key != "params"}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for line in compare_results({key: value for key, value in results.items() if key != "params"}, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
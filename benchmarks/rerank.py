@@ -0,0 +1,110 @@
+"""
+Reranking stage benchmark.
+
+Builds synthetic candidate sets in which a share of the chunks are
+near-duplicates of others (as left by repeated ingestions or overlapping
+chunks) and times Reranker.rerank on them. Reports p50/p95/p99 latency
+per call and how many near-duplicates were kept out of the context.
+
+Usage:
+    python -m benchmarks.rerank --candidates 20 --dimension 1536
+    python -m benchmarks.rerank --strategy cross_encoder --time-budget-ms 10000   # size the cross-encoder budget from its p95
+"""
+
+import argparse
+import json
+import time
+from array import array
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from benchmarks.common import compare_results, latency_summary, write_results
+from src.ai.rag.models import DocumentChunk, RetrievedDocumentChunk
+from src.ai.rag.reranker import Reranker
+
+
+def build_candidates(
+    rng: np.random.Generator,
+    candidates: int,
+    dimension: int,
+    duplicate_share: float,
+) -> Tuple[List[RetrievedDocumentChunk], int]:
+    """Returns candidates and the number of them that duplicate another candidate."""
+
+    originals = max(1, int(candidates * (1 - duplicate_share)))
+    vectors = rng.standard_normal((originals, dimension)).astype(np.float32)
+    sources = list(range(originals))
+    while len(vectors) < candidates:
+        index = int(rng.integers(originals))
+        noisy = vectors[index] + rng.standard_normal(dimension).astype(np.float32) * 0.01
+        vectors = np.vstack([vectors, noisy])
+        sources.append(index)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    chunks = []
+    for i, (vector, source) in enumerate(zip(vectors, sources)):
+        chunks.append(RetrievedDocumentChunk(
+            chunk=DocumentChunk(content=f"chunk {source}", source=f"doc_{source}.md", metadata={"chunk_index": i}),
+            distance=float(rng.uniform(0.1, 0.5)),
+            embedding=array("f", vector.tobytes()),
+        ))
+    return chunks, candidates - originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", default="mmr", choices=("mmr", "cross_encoder"))
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=8)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="Share of candidates that are near-duplicates")
+    parser.add_argument("--time-budget-ms", type=float, help="Default: the strategy's default budget")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/rerank-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    reranker = Reranker(
+        strategy=args.strategy,
+        candidate_pool=args.candidates,
+        top_n=args.top_n,
+        time_budget_ms=args.time_budget_ms,
+    )
+    candidate_sets = [
+        build_candidates(rng, args.candidates, args.dimension, args.duplicate_share)
+        for _ in range(min(args.runs, 50))
+    ]
+
+    latencies = []
+    duplicates_kept = 0
+    for run in range(args.runs):
+        candidates, _ = candidate_sets[run % len(candidate_sets)]
+        start = time.perf_counter()
+        context = reranker.rerank("synthetic query", candidates)
+        latencies.append(time.perf_counter() - start)
+        sources = [chunk.chunk.source for chunk in context]
+        duplicates_kept += len(sources) - len(set(sources))
+    reranker.close()
+
+    results = {
+        "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "latency": latency_summary(latencies),
+        "duplicates_in_candidates": sum(duplicates for _, duplicates in candidate_sets) / len(candidate_sets),
+        "duplicates_in_context": duplicates_kept / args.runs,
+    }
+    output = write_results("rerank", results, args.output)
+    print(json.dumps({key: value for key, value in results.items() if key != "params"}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for line in compare_results({key: value for key, value in results.items() if key != "params"}, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Offline retrieval benchmark and regression suite.
+
+Loads a synthetic corpus with known relevant chunks into a dedicated
+benchmark database as a throwaway ingestion, then measures:
+- Retriever.retrieve: latency, QPS, recall@k and MRR
+- RAGOrchestrator.run: end-to-end latency with stubbed LLMs
+- RAGOrchestrator.run_batch: throughput of the batch path
+
+Embeddings come from the deterministic HashingEmbeddingProvider and LLM
+calls from the fake client in benchmarks.fakes, so no network access is
+needed; only the local Postgres is used. While it runs, the synthetic
+ingestion is the latest one, so --database must name a separate database
+with the file_chunks and ingestion_metadata tables; the database the
+application is configured with (RAG_DB_NAME) is refused. The ingestion is
+deleted afterwards unless --keep is passed.
+
+Usage:
+    python -m benchmarks.retrieval --database rag_bench --docs 200 --queries 300
+    python -m benchmarks.retrieval --database rag_bench --baseline benchmarks/results/retrieval-abc1234.json
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from benchmarks.common import compare_results, latency_summary, write_results
+from benchmarks.fakes import FakeOpenAI
+from src.ai.rag.embeddings import HashingEmbeddingProvider
+from src.ai.rag.evaluator import ResponseEvaluator
+from src.ai.rag.generator import Generator
+from src.ai.rag.ingestor import DocumentIngestor
+from src.ai.rag.llm_cache import LLMResponseCache
+from src.ai.rag.models import DocumentChunk, IngestionContext
+from src.ai.rag.orchestrator import RAGOrchestrator
+from src.ai.rag.retriever import Retriever
+from src.db.connection import connect
+from src.db.retention import RetentionPlan, SupersededIngestion, apply_retention
+from src.db.schema import apply_schema
+
+_FILLER_WORDS = ["the", "system", "uses", "data", "with", "for"]
+
+ChunkKey = Tuple[str, int]
+
+
+@dataclass(slots=True)
+class LabelledQuery:
+    query: str
+    relevant: Set[ChunkKey]
+
+
+@dataclass(slots=True)
+class SyntheticCorpus:
+    chunks: List[DocumentChunk]
+    queries: List[LabelledQuery]
+
+
+def build_corpus(
+    docs: int,
+    chunks_per_doc: int,
+    queries: int,
+    ingestion: IngestionContext,
+    seed: int = 0,
+) -> SyntheticCorpus:
+    """
+    Builds chunks made of topic words unique to each chunk plus shared
+    filler words. Each query uses a subset of one chunk's topic words, so
+    that chunk is its only relevant result.
+    """
+
+    rng = random.Random(seed)
+
+    def word() -> str:
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(8))
+
+    chunks = []
+    topic_words = {}
+    for doc in range(docs):
+        source = f"synthetic/doc_{doc:05d}.md"
+        for chunk_index in range(chunks_per_doc):
+            words = [word() for _ in range(8)]
+            topic_words[(source, chunk_index)] = words
+            content = " ".join(words + rng.sample(_FILLER_WORDS, 4))
+            chunks.append(DocumentChunk(
+                content=content,
+                source=source,
+                metadata={"chunk_index": chunk_index},
+                ingestion=ingestion,
+            ))
+
+    keys = list(topic_words)
+    labelled_queries = []
+    for _ in range(queries):
+        key = rng.choice(keys)
+        query = " ".join(rng.sample(topic_words[key], 5)) + "?"
+        labelled_queries.append(LabelledQuery(query=query, relevant={key}))
+
+    return SyntheticCorpus(chunks=chunks, queries=labelled_queries)
+
+
+def load_corpus(ingestor: DocumentIngestor, corpus: SyntheticCorpus, batch_size: int = 1000):
+    """Embeds the corpus with the ingestor's provider and writes it as one ingestion."""
+
+    for start in range(0, len(corpus.chunks), batch_size):
+        ingestor._save_embeddings_to_db(ingestor._embed_chunks(corpus.chunks[start:start + batch_size]))
+
+
+def bench_retriever(retriever: Retriever, queries: List[LabelledQuery], ks=(1, 3, 5)) -> dict:
+    latencies = []
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = 0.0
+
+    for labelled in queries:
+        start = time.perf_counter()
+        result = retriever.retrieve(labelled.query, only_latest=True)
+        latencies.append(time.perf_counter() - start)
+
+        ranked = [(chunk.chunk.source, chunk.chunk.metadata["chunk_index"]) for chunk in result.chunks]
+        for k in ks:
+            if labelled.relevant & set(ranked[:k]):
+                hits[k] += 1
+        for rank, key in enumerate(ranked, start=1):
+            if key in labelled.relevant:
+                reciprocal_ranks += 1 / rank
+                break
+
+    return {
+        "latency": latency_summary(latencies),
+        "quality": {
+            **{f"recall@{k}": round(hits[k] / len(queries), 4) for k in ks},
+            "mrr": round(reciprocal_ranks / len(queries), 4),
+        },
+    }
+
+
+def bench_orchestrator(orchestrator: RAGOrchestrator, queries: List[LabelledQuery]) -> dict:
+    latencies = []
+    for labelled in queries:
+        start = time.perf_counter()
+        orchestrator.run(labelled.query, only_latest=True)
+        latencies.append(time.perf_counter() - start)
+    return {"latency": latency_summary(latencies)}
+
+
+def bench_orchestrator_batch(orchestrator: RAGOrchestrator, queries: List[LabelledQuery], batch_size: int) -> dict:
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        batch = [labelled.query for labelled in queries[offset:offset + batch_size]]
+        batch_start = time.perf_counter()
+        results = orchestrator.run_batch(batch, only_latest=True)
+        latencies.append(time.perf_counter() - batch_start)
+        errors += sum(1 for item in results if item["error"])
+    wall = time.perf_counter() - start
+    return {
+        "batch_latency": latency_summary(latencies),
+        "qps": round(len(queries) / wall, 2) if wall else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--database", required=True,
+        help="Dedicated benchmark database; the other connection settings come from RAG_DB_*",
+    )
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--orchestrator-queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency of each LLM call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/retrieval-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic ingestion in the database")
+    args = parser.parse_args()
+
+    # The synthetic ingestion becomes the latest one, which live only_latest traffic would be served
+    if args.database == os.getenv("RAG_DB_NAME", "rag"):
+        parser.error(f"--database {args.database} is the application database (RAG_DB_NAME); use a separate one")
+    # Read by every connect(), including the retriever's pool
+    os.environ["RAG_DB_NAME"] = args.database
+
+    client = FakeOpenAI(llm_latency_seconds=args.llm_latency_ms / 1000)
+    ingestion = IngestionContext(uuid.uuid4(), datetime.now())
+    corpus = build_corpus(args.docs, args.chunks_per_doc, args.queries, ingestion, seed=args.seed)
+
+    connection = connect()
+    apply_schema(connection)
+    embedding_provider = HashingEmbeddingProvider()
+    ingestor = DocumentIngestor(connection=connection, embedding_provider=embedding_provider)
+    try:
+        load_corpus(ingestor, corpus)
+        ingestor._update_ingestion_metadata(ingestion.ingestion_id, ingestion.ingested_at, len(corpus.chunks))
+
+        retriever = Retriever(embedding_provider=embedding_provider)
+        # Without a response cache, so repeated queries measure the full pipeline
+        no_cache = LLMResponseCache(store=None)
+        orchestrator = RAGOrchestrator(
+            retriever=retriever,
+            generator=Generator(client=client, cache=no_cache),
+            evaluator=ResponseEvaluator(client=client, cache=no_cache),
+        )
+
+        # Warm up connections and caches before measuring
+        for labelled in corpus.queries[:10]:
+            retriever.retrieve(labelled.query, only_latest=True)
+
+        orchestrator_queries = corpus.queries[:args.orchestrator_queries]
+        results = {
+            "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            "retriever": bench_retriever(retriever, corpus.queries),
+            "orchestrator": bench_orchestrator(orchestrator, orchestrator_queries),
+            "orchestrator_batch": bench_orchestrator_batch(orchestrator, orchestrator_queries, args.batch_size),
+        }
+    finally:
+        if not args.keep:
+            apply_retention(connection, RetentionPlan(ingestions=[
+                SupersededIngestion(str(ingestion.ingestion_id), ingestion.ingested_at, len(corpus.chunks), 0)
+            ]))
+        connection.close()
+
+    output = write_results("retrieval", results, args.output)
+    print(json.dumps({key: value for key, value in results.items() if key != "params"}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for line in compare_results({key: value for key, value in results.items() if key != "params"}, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
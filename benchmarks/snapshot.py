@@ -0,0 +1,139 @@
+"""
+Snapshot format benchmark.
+
+Writes a synthetic ingestion to a snapshot, verifies its checksums, reads
+it back through the memory-mapped reader and encodes every row the way
+binary COPY sends it to file_chunks. Compares the encoded size with the
+textual vector format of a plain SQL dump. Reports rows per second for
+each step and the projected time for ``--project`` chunks; the database's
+own COPY and index maintenance time are not included.
+
+Usage:
+    python -m benchmarks.snapshot --chunks 100000 --dimension 1536
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import psycopg
+from psycopg import adapt, pq
+from psycopg.adapt import AdaptersMap
+from psycopg.types import TypeInfo
+from psycopg.types.json import set_json_dumps
+from pgvector.psycopg.vector import register_vector_info
+
+from benchmarks.common import compare_results, write_results
+from src.db.snapshot import COPY_COLUMNS, Snapshot, SnapshotManifest, SnapshotWriter, verify_snapshot
+
+
+class _OfflineContext:
+    """Adaptation context standing in for a connection, with a made-up oid for the vector type."""
+
+    def __init__(self):
+        self.adapters = AdaptersMap(psycopg.adapters)
+        self.connection = None
+        register_vector_info(self, TypeInfo("vector", 1_000_000, 1_000_001))
+        set_json_dumps(lambda value: value, context=self)
+
+
+def _copy_transformer() -> adapt.Transformer:
+    context = _OfflineContext()
+    transformer = adapt.Transformer(context)
+    types = dict(zip(COPY_COLUMNS, ("varchar", "int4", "text", "vector", "jsonb")))
+    transformer.set_dumper_types(
+        [context.adapters.types.get_oid(types[column]) for column in COPY_COLUMNS], pq.Format.BINARY
+    )
+    return transformer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--chunk-chars", type=int, default=800)
+    parser.add_argument("--project", type=int, default=1_000_000, help="Chunk count to project timings to")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/snapshot-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ingestion_id = str(uuid.uuid4())
+    content = "x" * args.chunk_chars
+    embeddings = rng.standard_normal((1000, args.dimension)).astype(np.float32)
+
+    directory = Path(tempfile.mkdtemp(prefix="rag-snapshot-")) / "snapshot"
+    try:
+        start = time.perf_counter()
+        writer = SnapshotWriter(directory, SnapshotManifest(
+            ingestion_id=ingestion_id,
+            ingested_at="2026-01-01T00:00:00",
+            chunks_processed=args.chunks,
+            embedding_model="synthetic",
+            embedding_dimension=args.dimension,
+            row_count=args.chunks,
+        ))
+        for i in range(args.chunks):
+            metadata = json.dumps({"chunk_index": i % 50, "ingestion_id": ingestion_id, "source": f"docs/{i // 50}.md"})
+            writer.write_row((f"docs/{i // 50}.md", i % 50, content, embeddings[i % len(embeddings)], metadata))
+        manifest = writer.close()
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        verify_snapshot(directory)
+        verify_seconds = time.perf_counter() - start
+
+        transformer = _copy_transformer()
+        formats = [pq.Format.BINARY] * len(COPY_COLUMNS)
+        copy_bytes = 0
+        start = time.perf_counter()
+        for row in Snapshot(directory).rows():
+            copy_bytes += sum(len(value) for value in transformer.dump_sequence(row, formats))
+        read_encode_seconds = time.perf_counter() - start
+
+        snapshot_bytes = sum(entry["bytes"] for entry in manifest.files.values())
+        # Textual vector format of a plain SQL dump (shortest float4 text), measured on a sample of rows
+        text_vector_bytes = np.mean([
+            len("[" + ",".join(np.format_float_positional(value, unique=True, trim="-") for value in vector) + "]")
+            for vector in embeddings[:100]
+        ])
+    finally:
+        shutil.rmtree(directory.parent)
+
+    def rate(seconds: float) -> float:
+        return round(args.chunks / seconds, 1)
+
+    results = {
+        "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "snapshot_mib": round(snapshot_bytes / (1 << 20), 1),
+        "copy_binary_mib": round(copy_bytes / (1 << 20), 1),
+        "text_vector_bytes_per_row": round(float(text_vector_bytes), 1),
+        "binary_vector_bytes_per_row": 4 + 4 * args.dimension,
+        "rows_per_second": {
+            "write": rate(write_seconds),
+            "verify": rate(verify_seconds),
+            "read_and_encode": rate(read_encode_seconds),
+        },
+        "projected_seconds": {
+            "export_write": round(write_seconds * args.project / args.chunks, 1),
+            "import_verify_read_encode": round((verify_seconds + read_encode_seconds) * args.project / args.chunks, 1),
+        },
+    }
+    output = write_results("snapshot", results, args.output)
+    print(json.dumps({key: value for key, value in results.items() if key != "params"}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for line in compare_results({key: value for key, value in results.items() if key != "params"}, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
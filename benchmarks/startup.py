@@ -0,0 +1,64 @@
+"""
+Worker startup benchmark.
+
+Times ``import src.api.app`` in fresh interpreters, which every worker pays
+before it can serve, and reports which heavy dependencies were loaded by
+the import. Nothing connects to the database or the network.
+
+Usage:
+    python -m benchmarks.startup --runs 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.common import compare_results, latency_summary, write_results
+
+HEAVY_MODULES = ("openai", "tqdm", "pgvector", "sentence_transformers", "torch")
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import src.api.app
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/startup-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    latencies = []
+    loaded = set()
+    for _ in range(args.runs):
+        completed = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True)
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        latencies.append(probe["seconds"])
+        loaded.update(probe["loaded"])
+
+    results = {
+        "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "import_latency": latency_summary(latencies),
+        "heavy_modules_loaded": sorted(loaded),
+    }
+    output = write_results("startup", results, args.output)
+    print(json.dumps({key: value for key, value in results.items() if key != "params"}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for line in compare_results({key: value for key, value in results.items() if key != "params"}, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
+
+from dotenv import load_dotenv
+
+from src.utils.logger import getLogger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+load_dotenv()
+
+logger = getLogger(__name__)
+
+# Model and dimension of ingestions made before they were recorded per ingestion
+LEGACY_EMBEDDING_MODEL = "text-embedding-3-small"
+LEGACY_EMBEDDING_DIMENSION = 1536
+
+
+class EmbeddingMismatchError(Exception):
+    """Raised when the configured embedding model differs from the one an index was built with."""
+
+
+class EmbeddingProvider(ABC):
+    """
+    Responsible only for turning texts into embeddings.
+
+    Inputs are split into batches of ``batch_size`` texts and the batches
+    run concurrently on a thread pool of ``max_workers``. Embeddings are
+    returned as float32 ``array('f')`` buffers, in input order.
+
+    ``last_call`` is None until the first call, then "ok" or the error of
+    the most recent one.
+    """
+
+    model: str
+    dimension: int
+
+    def __init__(self, batch_size: int, max_workers: int):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.last_call: Optional[str] = None
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str]) -> List[array]:
+        """Embeds one batch of at most ``batch_size`` texts."""
+
+    def embed(self, texts: List[str]) -> List[array]:
+        if not texts:
+            return []
+        try:
+            embeddings = self._embed_batches(texts)
+        except Exception as e:
+            self.last_call = f"failed: {e}"
+            raise
+        self.last_call = "ok"
+        return embeddings
+
+    def _embed_batches(self, texts: List[str]) -> List[array]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        embeddings = []
+        for batch_embeddings in self._get_executor().map(self._embed_batch, batches):
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def embed_one(self, text: str) -> array:
+        return self.embed([text])[0]
+
+    def warm_up(self) -> None:
+        """Loads the model / opens connections so the first request does not pay for it."""
+
+        try:
+            self.embed_one("warm up")
+            logger.info(f"Embedding provider ready: {self.model} ({self.dimension} dimensions)")
+        except Exception as e:
+            logger.warning(f"Embedding provider warm-up failed: {e}")
+
+    def check(self) -> None:
+        """Raises if the backend cannot embed. Local models embed a short text, which costs nothing."""
+
+        # Bypasses embed() so probes do not overwrite last_call
+        self._embed_batch(["readiness probe"])
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+            return self._executor
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI API."""
+
+    def __init__(
+        self,
+        model: str = LEGACY_EMBEDDING_MODEL,
+        dimension: int = LEGACY_EMBEDDING_DIMENSION,
+        client: Optional["OpenAI"] = None,
+        batch_size: int = 256,
+        max_workers: int = 4,
+    ):
+        super().__init__(batch_size, max_workers)
+        self.model = model
+        self.dimension = dimension
+        if client is None:
+            # Imported here: the OpenAI SDK takes a large share of startup time
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+
+    def check(self) -> None:
+        # Looking the model up spends no tokens, unlike an embeddings request
+        self.client.models.retrieve(self.model)
+
+    def _embed_batch(self, texts: List[str]) -> List[array]:
+        # Only the text-embedding-3 models can shorten their output; the others must already match
+        options = {"dimensions": self.dimension} if self.model.startswith("text-embedding-3") else {}
+        response = self.client.embeddings.create(input=texts, model=self.model, **options)
+        embeddings = [array("f", item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+        if embeddings and len(embeddings[0]) != self.dimension:
+            raise EmbeddingMismatchError(
+                f"{self.model} returned {len(embeddings[0])}-dimensional embeddings, expected {self.dimension}"
+            )
+        return embeddings
+
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """
+    CPU-local embeddings from a sentence-transformers model.
+
+    Requires the optional ``sentence-transformers`` package; ``backend``
+    can be "onnx" to run the exported ONNX model. The model's dimension
+    must match the dimension of the file_chunks.embedding column.
+    """
+
+    def __init__(
+        self,
+        model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        backend: str = "torch",
+        batch_size: int = 64,
+        max_workers: int = 1,
+    ):
+        super().__init__(batch_size, max_workers)
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The local embedding provider requires sentence-transformers: pip install sentence-transformers"
+            ) from e
+
+        self.model = model
+        self.encoder = SentenceTransformer(model, device="cpu", backend=backend)
+        self.dimension = self.encoder.get_sentence_embedding_dimension()
+
+    def _embed_batch(self, texts: List[str]) -> List[array]:
+        vectors = self.encoder.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        embeddings = []
+        for vector in vectors:
+            embedding = array("f")
+            embedding.frombytes(vector.astype("float32").tobytes())
+            embeddings.append(embedding)
+        return embeddings
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic embeddings from hashed words and character n-grams.
+
+    Needs no model or network; texts sharing words or word fragments get
+    close vectors. Meant for tests, benchmarks and offline development.
+    """
+
+    _TOKEN_RE = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = LEGACY_EMBEDDING_DIMENSION, ngram: int = 3, batch_size: int = 256):
+        super().__init__(batch_size, max_workers=1)
+        self.model = f"hashing-{ngram}gram"
+        self.dimension = dimension
+        self.ngram = ngram
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in self._TOKEN_RE.findall(text.lower()):
+            features.append(token)
+            padded = f"<{token}>"
+            features.extend(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+        return features
+
+    def _embed_text(self, text: str) -> array:
+        vector = [0.0] * self.dimension
+        for feature in self._features(text):
+            digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if (digest >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return array("f", (value / norm for value in vector))
+
+    def _embed_batch(self, texts: List[str]) -> List[array]:
+        return [self._embed_text(text) for text in texts]
+
+
+_provider: Optional[EmbeddingProvider] = None
+_provider_lock = threading.Lock()
+
+
+def create_embedding_provider() -> EmbeddingProvider:
+    """
+    Builds the provider selected by RAG_EMBEDDING_PROVIDER:
+    - "openai" (default): RAG_EMBEDDING_MODEL, RAG_EMBEDDING_DIMENSION
+    - "local": sentence-transformers RAG_EMBEDDING_MODEL on RAG_EMBEDDING_BACKEND (torch/onnx)
+    - "hashing": RAG_EMBEDDING_DIMENSION
+    """
+
+    name = os.getenv("RAG_EMBEDDING_PROVIDER", "openai")
+    model = os.getenv("RAG_EMBEDDING_MODEL")
+    dimension = int(os.getenv("RAG_EMBEDDING_DIMENSION", str(LEGACY_EMBEDDING_DIMENSION)))
+
+    if name == "openai":
+        return OpenAIEmbeddingProvider(model=model or LEGACY_EMBEDDING_MODEL, dimension=dimension)
+    if name == "local":
+        return SentenceTransformerEmbeddingProvider(
+            model=model or "sentence-transformers/all-MiniLM-L6-v2",
+            backend=os.getenv("RAG_EMBEDDING_BACKEND", "torch"),
+        )
+    if name == "hashing":
+        return HashingEmbeddingProvider(dimension=dimension)
+    raise ValueError(f"Unknown embedding provider: {name}")
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Returns the process-wide embedding provider, creating it on first use."""
+
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_embedding_provider()
+        return _provider
@@ -1,19 +1,34 @@
-from openai import OpenAI
+import hashlib
+import json
+
 from dotenv import load_dotenv
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 from src.ai.rag.models import AnswerEvaluation, RetrievedDocumentChunk, DocumentChunk
+from src.ai.rag.generator import LLM_TOKENS, get_openai_client
+from src.ai.rag.llm_cache import LLMResponseCache, get_llm_cache
 from src.ai.rag.prompt_compiler import PromptCompiler
+from src.ai.rag.utils.limits import stage_limiter
+from src.utils.tracing import span
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 load_dotenv()
 
+# Part of the cache key, so entries written with an older AnswerEvaluation are not reused
+_EVALUATION_SCHEMA = hashlib.sha256(
+    json.dumps(AnswerEvaluation.model_json_schema(), sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
 class ResponseEvaluator:
     """
     Responsible for evaluating the response.
     """
 
-    def __init__(self):
-        self.client = OpenAI()
+    def __init__(self, client: Optional["OpenAI"] = None, cache: Optional[LLMResponseCache] = None):
+        self.client = client or get_openai_client()
         self.model = "gpt-4.1-nano"
+        self.cache = cache if cache is not None else get_llm_cache()
 
     def evaluate(
         self,
@@ -23,19 +38,41 @@ class ResponseEvaluator:
     ) -> AnswerEvaluation:
         """Evaluates the response."""
 
-        system_prompt, user_prompt = PromptCompiler.compile_evaluation_prompt(
-            query=query,
-            context=context,
-            answer=answer
-        )
+        with span("prompt_compile"):
+            system_prompt, user_prompt = PromptCompiler.compile_evaluation_prompt(
+                query=query,
+                context=context,
+                answer=answer
+            )
         
-        response = self.client.chat.completions.parse(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format=AnswerEvaluation,
-            temperature=0.0
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        params = {"temperature": 0.0, "response_format": AnswerEvaluation.__name__, "schema": _EVALUATION_SCHEMA}
+
+        cache_key = self.cache.key(self.model, messages, params)
+        cached = self.cache.get("evaluation", cache_key, AnswerEvaluation.model_validate_json)
+        if cached is not None:
+            return cached
+
+        with stage_limiter.limit("llm"):
+            response = self.client.chat.completions.parse(
+                model=self.model,
+                messages=messages,
+                response_format=AnswerEvaluation,
+                temperature=0.0
+            )
+
+        LLM_TOKENS.inc(response.usage.prompt_tokens, model=response.model, stage="evaluation", kind="input")
+        LLM_TOKENS.inc(response.usage.completion_tokens, model=response.model, stage="evaluation", kind="output")
+
+        evaluation = response.choices[0].message.parsed
+        self.cache.put(
+            cache_key,
+            evaluation.model_dump_json(),
+            context,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens
         )
-        return response.choices[0].message.parsed
\ No newline at end of file
+        return evaluation
\ No newline at end of file
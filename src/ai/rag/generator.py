@@ -1,34 +1,110 @@
-from typing import List
-from openai import OpenAI
-from openai.types.chat.chat_completion import ChatCompletion
+import os
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from src.ai.rag.llm_cache import LLMResponseCache, get_llm_cache
 from src.ai.rag.models import RetrievedDocumentChunk
 from src.ai.rag.prompt_compiler import PromptCompiler
+from src.ai.rag.utils.limits import stage_limiter
 from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+from src.utils.tracing import span
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from openai.types.chat.chat_completion import ChatCompletion
 
 logger = getLogger(__name__)
 
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total",
+    "Tokens used by LLM calls",
+    ("model", "stage", "kind"),
+)
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> "OpenAI":
+    """
+    Returns the OpenAI client shared by this process's generators and
+    evaluators. It is created on first use, after the worker started, and
+    the SDK is only imported then.
+    """
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+
+            _client = OpenAI()
+        return _client
+
+
+def _forget_client_after_fork() -> None:
+    # The parent's HTTP connections must not be shared with a child
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
 class Generator:
     """
     Responsible only for generating an answer grounded
     in retrieved document context.
     """
 
-    def __init__(self):
-        self.client = OpenAI()
+    def __init__(self, client: Optional["OpenAI"] = None, cache: Optional[LLMResponseCache] = None):
+        self.client = client or get_openai_client()
         self.model = "gpt-4.1-nano"
+        self.cache = cache if cache is not None else get_llm_cache()
 
-    def generate_response(self, context: List[RetrievedDocumentChunk], sub_queries: List[str]) -> ChatCompletion:
+    def generate_response(self, context: List[RetrievedDocumentChunk], sub_queries: List[str]) -> "ChatCompletion":
         """Generates an answer strictly using the provided context."""
 
-        system_prompt, user_prompt = PromptCompiler.compile(context, sub_queries)
+        return self.generate(context, sub_queries)[0]
+
+    def generate(self, context: List[RetrievedDocumentChunk], sub_queries: List[str]) -> Tuple["ChatCompletion", bool]:
+        """Like generate_response, also telling whether the answer came from the response cache."""
+
+        with span("prompt_compile"):
+            system_prompt, user_prompt = PromptCompiler.compile(context, sub_queries)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        params = {"temperature": 0.0}
+
+        cache_key = self.cache.key(self.model, messages, params)
+        cached = self.cache.get("generation", cache_key, _decode_completion)
+        if cached is not None:
+            return cached, True
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.0
+        with stage_limiter.limit("llm"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                **params
+            )
+
+        LLM_TOKENS.inc(response.usage.prompt_tokens, model=response.model, stage="generation", kind="input")
+        LLM_TOKENS.inc(response.usage.completion_tokens, model=response.model, stage="generation", kind="output")
+
+        self.cache.put(
+            cache_key,
+            response.model_dump_json(),
+            context,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens
         )
-        
-        return response
+        return response, False
+
+
+def _decode_completion(payload: str) -> "ChatCompletion":
+    from openai.types.chat.chat_completion import ChatCompletion
+
+    return ChatCompletion.model_validate_json(payload)
@@ -0,0 +1,128 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+from src.ai.rag.ingestor import DocumentIngestor, IngestionCancelled
+from src.ai.rag.models import IngestionProgress
+from src.db.connection import connect
+from src.utils.logger import getLogger
+
+logger = getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+
+@dataclass(slots=True)
+class IngestionJob:
+    job_id: uuid.UUID
+    directory: Path
+    status: JobStatus = "queued"
+    progress: IngestionProgress = field(default_factory=IngestionProgress)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": str(self.job_id),
+            "directory": str(self.directory),
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "progress": self.progress.to_dict(),
+        }
+
+
+class IngestionJobManager:
+    """
+    Responsible for running DocumentIngestor.ingest_directory in the background:
+    - Queueing jobs on a dedicated worker pool, off the serving event loop
+    - Tracking job status and progress
+    - Cancelling queued or running jobs
+
+    Each job writes through its own database connection, so a large
+    ingestion never holds the shared connection used by chat requests.
+    Jobs run one at a time by default to bound the load they add.
+
+    Jobs are tracked in memory, so they are only visible to the worker
+    process that started them.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self.jobs: Dict[uuid.UUID, IngestionJob] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, directory: Path) -> IngestionJob:
+        """Queues an ingestion of the given directory and returns its job."""
+
+        job = IngestionJob(job_id=uuid.uuid4(), directory=directory)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        self.executor.submit(self._run, job)
+        logger.info(f"Queued ingestion job {job.job_id} for {directory}")
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[IngestionJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: uuid.UUID) -> Optional[IngestionJob]:
+        """Requests cancellation. Running jobs stop at their next chunk."""
+
+        job = self.get(job_id)
+        if job is not None and job.status in ("queued", "running"):
+            job.cancel_event.set()
+            logger.info(f"Cancellation requested for ingestion job {job_id}")
+        return job
+
+    def shutdown(self):
+        """Cancels every unfinished job and waits for the workers to stop."""
+
+        for job in self.list_jobs():
+            if job.status in ("queued", "running"):
+                job.cancel_event.set()
+        self.executor.shutdown(wait=True)
+
+    def _run(self, job: IngestionJob):
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = datetime.now()
+            return
+
+        job.status = "running"
+        connection = None
+        try:
+            connection = connect()
+            ingestor = DocumentIngestor(
+                connection=connection,
+                progress=job.progress,
+                cancel_event=job.cancel_event,
+            )
+            ingestor.ingest_directory(job.directory)
+            job.status = "completed"
+            logger.info(f"Ingestion job {job.job_id} completed with {job.progress.chunks_written} chunks")
+        except IngestionCancelled:
+            job.status = "cancelled"
+            logger.info(f"Ingestion job {job.job_id} cancelled")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Ingestion job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.now()
+            if connection is not None:
+                connection.close()
+
+
+ingestion_jobs = IngestionJobManager()
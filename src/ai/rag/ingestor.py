@@ -1,17 +1,24 @@
 import uuid
 from datetime import datetime
-from src.ai.rag.models import DocumentChunk, DocumentChunkEmbedding
-from src.db.connection import conn
-from typing import List, Any, Dict
-from openai import OpenAI
-from tqdm import tqdm
+import sys
+import threading
+from src.ai.rag.models import DocumentChunk, DocumentChunkEmbedding, IngestionContext, IngestionProgress
+from src.db.connection import connect
+from psycopg import Connection
+from typing import List, Any, Dict, Optional
+from src.ai.rag.embeddings import EmbeddingProvider, get_embedding_provider
+from src.ai.rag.llm_cache import get_llm_cache
+from src.utils.logger import getLogger
 from pathlib import Path
 from uuid import uuid4
 from dotenv import load_dotenv
 import json
+import numpy as np
 
 load_dotenv()
 
+logger = getLogger(__name__)
+
 
 def _make_json_serializable(obj: Any) -> Any:
     """Converts UUID and datetime objects to JSON-serializable types."""
@@ -26,6 +33,10 @@ def _make_json_serializable(obj: Any) -> Any:
     return obj
 
 
+class IngestionCancelled(Exception):
+    """Raised inside an ingestion when its cancel event has been set."""
+
+
 class DocumentIngestor:
     """
     Responsible for:
@@ -40,15 +51,39 @@ class DocumentIngestor:
     - Interact with APIs at request time
     """
 
-    def __init__(self):
-        self.client = OpenAI()
+    def __init__(
+        self,
+        connection: Optional[Connection] = None,
+        progress: Optional[IngestionProgress] = None,
+        cancel_event: Optional[threading.Event] = None,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+    ):
+        """
+        Args:
+            connection: Database connection to write with (defaults to a new one).
+                Ingestions never borrow from the request pool, so a long run does
+                not hold a connection request handlers need.
+            progress: Counters updated as files are embedded and written.
+            cancel_event: When set, the ingestion stops at the next embedding batch
+                and raises IngestionCancelled.
+            embedding_provider: Provider used to embed chunks (defaults to the
+                configured one). Its model and dimension are recorded per ingestion.
+        """
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        self.conn = connection if connection is not None else connect()
+        self.progress = progress or IngestionProgress()
+        self.cancel_event = cancel_event
+
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise IngestionCancelled()
 
 
     def _chunk_document_text(
         self, document_text: str,
         file_name: str,
-        ingestion_id: uuid.UUID,
-        ingested_at: datetime,
+        ingestion: IngestionContext,
         chunk_size: int = 500,
         overlap: int = 50,
     ) -> List[DocumentChunk]:
@@ -63,7 +98,8 @@ class DocumentIngestor:
                 DocumentChunk(
                     content=chunk_text,
                     source=file_name,
-                    metadata={"chunk_index": idx, "ingestion_id": ingestion_id, "ingested_at": ingested_at}
+                    metadata={"chunk_index": idx},
+                    ingestion=ingestion,
                 )
             )
             idx += 1
@@ -74,22 +110,23 @@ class DocumentIngestor:
         self,
         chunks: List[DocumentChunk]
     ) -> List[DocumentChunkEmbedding]:
-        """Embeds the chunks using the OpenAI API."""
-
-        client = OpenAI()
+        """Embeds the chunks with the embedding provider, several batches at a time."""
 
         embeded_chunks = []
-
-        for chunk in tqdm(chunks, desc="Embedding chunks", leave=False):
-            embedding = client.embeddings.create(
-                input=chunk.content,
-                model="text-embedding-3-small"
-            )
-            embeded_chunk = DocumentChunkEmbedding(
-                document_chunk=chunk,
-                embedding=embedding.data[0].embedding
+        # Enough chunks per step to keep every provider worker busy
+        step = self.embedding_provider.batch_size * self.embedding_provider.max_workers
+
+        from tqdm import tqdm
+
+        for start in tqdm(range(0, len(chunks), step), desc="Embedding chunks", leave=False):
+            self._check_cancelled()
+            batch = chunks[start:start + step]
+            embeddings = self.embedding_provider.embed([chunk.content for chunk in batch])
+            embeded_chunks.extend(
+                DocumentChunkEmbedding(document_chunk=chunk, embedding=embedding)
+                for chunk, embedding in zip(batch, embeddings)
             )
-            embeded_chunks.append(embeded_chunk)
+            self.progress.chunks_embedded += len(batch)
         
         return embeded_chunks
 
@@ -100,26 +137,64 @@ class DocumentIngestor:
     ):
         """Saves the embeddings to the database."""
 
-        with conn.cursor() as cursor:
-            for embedding in tqdm(embeddings, desc="Saving embeddings to database", leave=False):
-                # Convert metadata to JSON-serializable format
-                serializable_metadata = _make_json_serializable(embedding.document_chunk.metadata)
-                cursor.execute(
-                    "INSERT INTO file_chunks (file_name, chunk_index, content, embedding, metadata) VALUES (%s, %s, %s, %s, %s)",
-                    (embedding.document_chunk.source, embedding.document_chunk.metadata["chunk_index"], embedding.document_chunk.content, embedding.embedding, json.dumps(serializable_metadata))
-                )
-            conn.commit()
+        with self.conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO file_chunks (file_name, chunk_index, content, embedding, metadata) VALUES (%s, %s, %s, %s, %s)",
+                (self._to_row(embedding) for embedding in embeddings)
+            )
+            self.conn.commit()
+        self.progress.chunks_written += len(embeddings)
+
+
+    @staticmethod
+    def _to_row(embedding: DocumentChunkEmbedding) -> tuple:
+        """Builds the file_chunks row for an embedded chunk."""
+
+        chunk = embedding.document_chunk
+        # Convert metadata to JSON-serializable format
+        serializable_metadata = _make_json_serializable(chunk.full_metadata())
+        # float32 view over the array buffer (no Python list); pgvector converts it to its text format when dumping
+        vector = np.frombuffer(embedding.embedding, dtype=np.float32)
+        return (chunk.source, chunk.metadata["chunk_index"], chunk.content, vector, json.dumps(serializable_metadata))
 
     
     def _update_ingestion_metadata(self, ingestion_id: uuid.UUID, ingested_at: datetime, chunks_processed: int):
         """Updates the ingestion metadata."""
 
-        with conn.cursor() as cursor:
+        with self.conn.cursor() as cursor:
             cursor.execute(
-                "INSERT INTO ingestion_metadata (ingestion_id, ingested_at, chunks_processed) VALUES (%s, %s, %s)",
-                (ingestion_id, ingested_at, chunks_processed)
+                "INSERT INTO ingestion_metadata (ingestion_id, ingested_at, chunks_processed, embedding_model, embedding_dimension) VALUES (%s, %s, %s, %s, %s)",
+                (ingestion_id, ingested_at, chunks_processed, self.embedding_provider.model, self.embedding_provider.dimension)
             )
-            conn.commit()
+            self.conn.commit()
+
+
+    def _delete_ingestion_chunks(self, ingestion_id: uuid.UUID):
+        """Removes the chunks already written by an ingestion that did not complete."""
+
+        # The failure may have left the connection in an aborted transaction
+        self.conn.rollback()
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM file_chunks WHERE metadata->>'ingestion_id' = %s",
+                (str(ingestion_id),)
+            )
+            self.conn.commit()
+        get_llm_cache().invalidate_ingestions([str(ingestion_id)])
+
+
+    def _ingest_file(self, file_path: Path, ingestion: IngestionContext) -> int:
+        """Chunks, embeds and saves a single file. Returns the number of chunks."""
+
+        with open(file_path, "r", encoding="utf-8") as f:
+            document_text = f.read()
+        chunks = self._chunk_document_text(document_text, str(file_path), ingestion)
+        self.progress.files_started += 1
+        self.progress.chunks_total += len(chunks)
+        embedded_chunks = self._embed_chunks(chunks)
+        self._save_embeddings_to_db(embedded_chunks)
+        self.progress.files_processed += 1
+        return len(chunks)
 
 
     def ingest_file(self, file_path: Path, ingestion_id = None, ingested_at = None, save_ingestion_metadata = True):
@@ -131,34 +206,50 @@ class DocumentIngestor:
         if not ingested_at:
             ingested_at = datetime.now()
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            document_text = f.read()
-        chunks = self._chunk_document_text(document_text, str(file_path), ingestion_id, ingested_at)
-        embedded_chunks = self._embed_chunks(chunks)
-        self._save_embeddings_to_db(embedded_chunks)
+        chunks_processed = self._ingest_file(file_path, IngestionContext(ingestion_id, ingested_at))
 
         if save_ingestion_metadata:
-            self._update_ingestion_metadata(ingestion_id, ingested_at, len(chunks))
+            self._update_ingestion_metadata(ingestion_id, ingested_at, chunks_processed)
 
-        return ingestion_id, ingested_at, len(chunks)
+        return ingestion_id, ingested_at, chunks_processed
 
 
     def ingest_directory(self, directory_path: Path):
-        """Ingests a directory of documents."""
+        """
+        Ingests a directory of documents.
+
+        If the ingestion is cancelled or fails, the chunks written so far are
+        deleted and the exception is re-raised; no ingestion metadata is saved.
+        Chunks without ingestion metadata would otherwise stay in file_chunks,
+        where searches not limited to the latest ingestion would find them.
+        """
+
+        from tqdm import tqdm
 
         ingestion_id = uuid4()
         ingested_at = datetime.now()
+        ingestion = IngestionContext(ingestion_id, ingested_at)
         total_chunks = 0
 
-        for file in tqdm(directory_path.glob("*.md"), desc=f"Processing {directory_path}", leave=False):
-            _, _, chunks_processed = self.ingest_file(file, ingestion_id, ingested_at, save_ingestion_metadata=False)
-            total_chunks += chunks_processed
+        files = sorted(directory_path.glob("*.md"))
+        self.progress.start(ingestion_id, len(files))
+
+        try:
+            for file in tqdm(files, desc=f"Processing {directory_path}", leave=False):
+                self._check_cancelled()
+                total_chunks += self._ingest_file(file, ingestion)
+            self._update_ingestion_metadata(ingestion_id, ingested_at, total_chunks)
+        except BaseException:
+            try:
+                self._delete_ingestion_chunks(ingestion_id)
+            except Exception as e:
+                logger.error(f"Could not delete the chunks of incomplete ingestion {ingestion_id}: {e}")
+            raise
 
-        self._update_ingestion_metadata(ingestion_id, ingested_at, total_chunks)
         return ingestion_id, ingested_at, total_chunks
 
 
 if __name__ == "__main__":
-    path = Path("data/raw_docs/baml")
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("data/raw_docs/baml")
     ingestor = DocumentIngestor()
     ingestor.ingest_directory(path)
\ No newline at end of file
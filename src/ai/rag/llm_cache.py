@@ -0,0 +1,474 @@
+"""
+Cache of LLM responses keyed on the exact request.
+
+Generation and evaluation run at temperature 0, so the same model, prompts
+and parameters give the same output. The cache key is a SHA-256 of those;
+entries remember the ingestions whose chunks were in the prompt, so they
+can be dropped when an ingestion is deleted.
+
+Storage is pluggable, selected by RAG_LLM_CACHE:
+- "memory" (default): per-process LRU
+- "sqlite": file at RAG_LLM_CACHE_PATH, shared by the workers of one host
+- "postgres": llm_response_cache table, shared by every worker
+- "none": disabled
+Entries expire after RAG_LLM_CACHE_TTL_SECONDS (default one day). Every
+RAG_LLM_CACHE_PURGE_EVERY writes, expired entries are deleted and the store
+is trimmed to RAG_LLM_CACHE_MAX_ENTRIES, dropping the entries closest to
+expiry first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from src.ai.rag.models import RetrievedDocumentChunk
+from src.db.connection import get_pool
+from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_CACHE_REQUESTS = REGISTRY.counter(
+    "rag_llm_cache_requests_total",
+    "LLM response cache lookups",
+    ("stage", "result"),
+)
+LLM_CACHE_SAVED_TOKENS = REGISTRY.counter(
+    "rag_llm_cache_saved_tokens_total",
+    "Tokens not spent thanks to LLM response cache hits",
+    ("stage", "kind"),
+)
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    payload: str
+    ingestion_ids: Tuple[str, ...]
+    expires_at: float
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMCacheStore(ABC):
+    """Storage backend of the LLM response cache."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Returns the entry for a key, expired or not."""
+
+    @abstractmethod
+    def put(self, key: str, entry: CachedResponse) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_ingestions(self, ingestion_ids: List[str]) -> int:
+        """Deletes every entry built from chunks of the given ingestions. Returns the count."""
+
+    @abstractmethod
+    def purge(self) -> int:
+        """Deletes expired entries, then the ones expiring soonest beyond the size limit. Returns the count."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryLLMCacheStore(LLMCacheStore):
+    """Per-process LRU store."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_ingestions(self, ingestion_ids: List[str]) -> int:
+        ids = set(ingestion_ids)
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if ids.intersection(entry.ingestion_ids)]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+    def purge(self) -> int:
+        # put() already keeps the LRU within max_entries
+        now = time.time()
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if entry.expires_at <= now]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+
+class SQLiteLLMCacheStore(LLMCacheStore):
+    """SQLite store; in WAL mode it is shared safely by the worker processes of one host."""
+
+    def __init__(self, path: Path, max_entries: int = 10000):
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    input_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache_ingestions (
+                    key TEXT NOT NULL,
+                    ingestion_id TEXT NOT NULL,
+                    PRIMARY KEY (ingestion_id, key)
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS llm_response_cache_expires_at_idx ON llm_response_cache (expires_at)"
+            )
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT payload, expires_at, input_tokens, output_tokens FROM llm_response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            ingestion_ids = self.connection.execute(
+                "SELECT ingestion_id FROM llm_response_cache_ingestions WHERE key = ?",
+                (key,)
+            ).fetchall()
+        payload, expires_at, input_tokens, output_tokens = row
+        return CachedResponse(payload, tuple(id for (id,) in ingestion_ids), expires_at, input_tokens, output_tokens)
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO llm_response_cache VALUES (?, ?, ?, ?, ?)",
+                (key, entry.payload, entry.expires_at, entry.input_tokens, entry.output_tokens)
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO llm_response_cache_ingestions VALUES (?, ?)",
+                [(key, ingestion_id) for ingestion_id in entry.ingestion_ids]
+            )
+
+    def delete(self, key: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+            self.connection.execute("DELETE FROM llm_response_cache_ingestions WHERE key = ?", (key,))
+
+    def invalidate_ingestions(self, ingestion_ids: List[str]) -> int:
+        if not ingestion_ids:
+            return 0
+        placeholders = ",".join("?" * len(ingestion_ids))
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN")
+            keys = [key for (key,) in self.connection.execute(
+                f"SELECT DISTINCT key FROM llm_response_cache_ingestions WHERE ingestion_id IN ({placeholders})",
+                ingestion_ids
+            )]
+            self.connection.executemany("DELETE FROM llm_response_cache WHERE key = ?", [(key,) for key in keys])
+            self.connection.executemany(
+                "DELETE FROM llm_response_cache_ingestions WHERE key = ?", [(key,) for key in keys]
+            )
+        return len(keys)
+
+    def purge(self) -> int:
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN")
+            purged = self.connection.execute(
+                "DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            purged += self.connection.execute(
+                """
+                DELETE FROM llm_response_cache WHERE key IN (
+                    SELECT key FROM llm_response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            ).rowcount
+            if purged:
+                self.connection.execute(
+                    "DELETE FROM llm_response_cache_ingestions WHERE key NOT IN (SELECT key FROM llm_response_cache)"
+                )
+        return purged
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class PostgresLLMCacheStore(LLMCacheStore):
+    """
+    Store in the llm_response_cache table (see src.db.schema), shared by
+    every worker. Each operation borrows a connection from the worker's
+    pool and commits on its own, so lookups run concurrently and a broken
+    connection is replaced after a database restart.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with get_pool().connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT payload, ingestion_ids, EXTRACT(EPOCH FROM expires_at), input_tokens, output_tokens
+                    FROM llm_response_cache WHERE key = %s
+                    """,
+                    (key,)
+                )
+                row = cursor.fetchone()
+            connection.commit()
+        if row is None:
+            return None
+        payload, ingestion_ids, expires_at, input_tokens, output_tokens = row
+        return CachedResponse(payload, tuple(ingestion_ids), float(expires_at), input_tokens, output_tokens)
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with get_pool().connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO llm_response_cache (key, payload, ingestion_ids, expires_at, input_tokens, output_tokens)
+                    VALUES (%s, %s, %s, to_timestamp(%s), %s, %s)
+                    ON CONFLICT (key) DO UPDATE SET
+                        payload = EXCLUDED.payload,
+                        ingestion_ids = EXCLUDED.ingestion_ids,
+                        expires_at = EXCLUDED.expires_at,
+                        input_tokens = EXCLUDED.input_tokens,
+                        output_tokens = EXCLUDED.output_tokens
+                    """,
+                    (key, entry.payload, list(entry.ingestion_ids), entry.expires_at, entry.input_tokens, entry.output_tokens)
+                )
+            connection.commit()
+
+    def delete(self, key: str) -> None:
+        with get_pool().connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM llm_response_cache WHERE key = %s", (key,))
+            connection.commit()
+
+    def invalidate_ingestions(self, ingestion_ids: List[str]) -> int:
+        with get_pool().connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM llm_response_cache WHERE ingestion_ids && %s::text[] OR expires_at < now()",
+                    (list(ingestion_ids),)
+                )
+                invalidated = cursor.rowcount
+            connection.commit()
+        return invalidated
+
+    def purge(self) -> int:
+        with get_pool().connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM llm_response_cache WHERE expires_at < now()")
+                purged = cursor.rowcount
+                cursor.execute(
+                    """
+                    DELETE FROM llm_response_cache WHERE key IN (
+                        SELECT key FROM llm_response_cache ORDER BY expires_at DESC OFFSET %s
+                    )
+                    """,
+                    (self.max_entries,)
+                )
+                purged += cursor.rowcount
+            connection.commit()
+        return purged
+
+
+class LLMResponseCache:
+    """
+    Responsible only for looking up and storing LLM responses:
+    - Computing the request key
+    - Expiring entries after ``ttl_seconds``, purging the store every ``purge_every`` writes
+    - Recording hits, misses and the tokens they saved
+
+    With no store, every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, store: Optional[LLMCacheStore], ttl_seconds: float = 86400, purge_every: int = 100):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self.writes = 0
+        self.writes_lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        request = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(self, stage: str, key: str, decode: Callable[[str], T]) -> Optional[T]:
+        """
+        Returns the decoded cached response, or None on a miss.
+
+        Entries that have expired, or whose payload ``decode`` rejects (e.g.
+        written before a response model changed), are deleted and count as
+        misses.
+        """
+
+        if self.store is None:
+            return None
+        response = None
+        try:
+            entry = self.store.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self.store.delete(key)
+                entry = None
+            if entry is not None:
+                try:
+                    response = decode(entry.payload)
+                except ValueError as e:
+                    logger.warning(f"Dropping undecodable {stage} cache entry: {e}")
+                    self.store.delete(key)
+        except Exception as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            response = None
+
+        LLM_CACHE_REQUESTS.inc(stage=stage, result="hit" if response is not None else "miss")
+        if response is not None:
+            LLM_CACHE_SAVED_TOKENS.inc(entry.input_tokens, stage=stage, kind="input")
+            LLM_CACHE_SAVED_TOKENS.inc(entry.output_tokens, stage=stage, kind="output")
+        return response
+
+    def put(
+        self,
+        key: str,
+        payload: str,
+        context: Iterable[RetrievedDocumentChunk],
+        input_tokens: int = 0,
+        output_tokens: int = 0
+    ) -> None:
+        if self.store is None:
+            return
+        entry = CachedResponse(
+            payload=payload,
+            ingestion_ids=_ingestion_ids(context),
+            expires_at=time.time() + self.ttl_seconds,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
+        try:
+            self.store.put(key, entry)
+        except Exception as e:
+            logger.error(f"LLM cache write failed: {e}")
+            return
+
+        with self.writes_lock:
+            self.writes += 1
+            due = self.writes % self.purge_every == 0
+        if due:
+            # Lookups only delete the expired entry they hit, so without this the store only grows
+            try:
+                purged = self.store.purge()
+            except Exception as e:
+                logger.error(f"LLM cache purge failed: {e}")
+                return
+            if purged:
+                logger.info(f"Purged {purged} cached LLM responses")
+
+    def invalidate_ingestions(self, ingestion_ids: List[str]) -> int:
+        """Drops every cached response whose prompt used chunks of the given ingestions."""
+
+        if self.store is None or not ingestion_ids:
+            return 0
+        # Callers have already committed their deletes; a cache outage must not abort them
+        try:
+            invalidated = self.store.invalidate_ingestions([str(ingestion_id) for ingestion_id in ingestion_ids])
+        except Exception as e:
+            logger.error(f"LLM cache invalidation failed: {e}")
+            return 0
+        if invalidated:
+            logger.info(f"Invalidated {invalidated} cached LLM responses")
+        return invalidated
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+
+def _ingestion_ids(context: Iterable[RetrievedDocumentChunk]) -> Tuple[str, ...]:
+    ids = {
+        str(chunk.chunk.metadata["ingestion_id"])
+        for chunk in context
+        if chunk.chunk.metadata and chunk.chunk.metadata.get("ingestion_id")
+    }
+    return tuple(sorted(ids))
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def create_llm_cache() -> LLMResponseCache:
+    """Builds the cache from the RAG_LLM_CACHE* variables described in the module docstring."""
+
+    name = os.getenv("RAG_LLM_CACHE", "memory")
+    ttl_seconds = float(os.getenv("RAG_LLM_CACHE_TTL_SECONDS", "86400"))
+    max_entries = int(os.getenv("RAG_LLM_CACHE_MAX_ENTRIES", "10000"))
+    purge_every = int(os.getenv("RAG_LLM_CACHE_PURGE_EVERY", "100"))
+
+    if name == "none":
+        return LLMResponseCache(None, ttl_seconds)
+    if name == "memory":
+        store = MemoryLLMCacheStore(max_entries)
+    elif name == "sqlite":
+        store = SQLiteLLMCacheStore(Path(os.getenv("RAG_LLM_CACHE_PATH", "data/llm_cache.sqlite3")), max_entries)
+    elif name == "postgres":
+        store = PostgresLLMCacheStore(max_entries)
+    else:
+        raise ValueError(f"Unknown LLM cache: {name}")
+    return LLMResponseCache(store, ttl_seconds, purge_every)
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Returns the process-wide LLM response cache, creating it on first use."""
+
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = create_llm_cache()
+        return _cache
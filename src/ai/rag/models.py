@@ -1,28 +1,113 @@
+import time
+import uuid
+from array import array
 from dataclasses import dataclass
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class IngestionContext:
+    """
+    Metadata shared by every chunk of a single ingestion run.
+
+    One instance is referenced by all chunks of the run instead of
+    repeating the same values in each chunk's metadata dict.
+    """
+    ingestion_id: uuid.UUID
+    ingested_at: datetime
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return {"ingestion_id": self.ingestion_id, "ingested_at": self.ingested_at}
+
+
+@dataclass(slots=True)
 class DocumentChunk:
     content: str
     source: str
     metadata: Optional[Dict[str, Any]] = None
+    ingestion: Optional[IngestionContext] = None
+
+    def full_metadata(self) -> Dict[str, Any]:
+        """Returns the chunk metadata merged with the shared ingestion metadata."""
+        merged = dict(self.metadata or {})
+        if self.ingestion is not None:
+            merged.update(self.ingestion.as_metadata())
+        return merged
 
-@dataclass
+@dataclass(slots=True)
 class RetrievedDocumentChunk:
     chunk: DocumentChunk
     distance: float
+    embedding: Optional[array] = None
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     chunks: List[RetrievedDocumentChunk]
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunkEmbedding:
+    """
+    A chunk together with its embedding.
+
+    The embedding is a contiguous float32 buffer (``array('f')``) rather
+    than a list of boxed Python floats, so it can be handed to NumPy and
+    pgvector without copying element by element.
+    """
     document_chunk: DocumentChunk
-    embedding: List[float]
+    embedding: array
+
+
+@dataclass(slots=True)
+class IngestionProgress:
+    """
+    Live counters of a running ingestion.
+
+    Updated by the ingesting thread only; readers get a consistent enough
+    snapshot through ``to_dict`` for progress reporting.
+    """
+    ingestion_id: Optional[uuid.UUID] = None
+    files_total: int = 0
+    files_started: int = 0
+    files_processed: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_written: int = 0
+    started_at: Optional[float] = None
+
+    def start(self, ingestion_id: uuid.UUID, files_total: int) -> None:
+        self.ingestion_id = ingestion_id
+        self.files_total = files_total
+        self.started_at = time.monotonic()
+
+    def rate(self) -> float:
+        """Chunks written per second since the ingestion started."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.chunks_written / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds left, extrapolating chunks per file from the files seen so far."""
+        rate = self.rate()
+        if not self.files_started or rate <= 0:
+            return None
+        estimated_chunks = self.chunks_total / self.files_started * self.files_total
+        return max(estimated_chunks - self.chunks_written, 0) / rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        eta = self.eta_seconds()
+        return {
+            "ingestion_id": str(self.ingestion_id) if self.ingestion_id else None,
+            "files_total": self.files_total,
+            "files_processed": self.files_processed,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_written": self.chunks_written,
+            "chunks_per_second": round(self.rate(), 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
 
 
 
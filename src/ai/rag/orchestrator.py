@@ -1,19 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional
+from src.ai.rag.models import RetrievalResult, RetrievedDocumentChunk
 from src.ai.rag.retriever import Retriever
 from src.ai.rag.generator import Generator
 from src.ai.rag.evaluator import ResponseEvaluator
-from src.ai.rag.query_analyzer import generate_sub_queries
+from src.ai.rag.reranker import Reranker, get_reranker
+from src.ai.rag.query_analyzer import generate_sub_queries, normalize_query
 from src.ai.rag.utils.retriever_utils import dedupe_retrieved_chunks, filter_top_k_chunks
 from src.ai.rag.utils.confidence import compute_confidence
 from src.ai.rag.utils.debug_utils import DebugUtils
+from src.ai.rag.utils.singleflight import SingleFlight
 from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+from src.utils.tracing import current_span, current_trace, format_traceparent, span, start_trace
 
 logger = getLogger(__name__)
 
+# Shared by all orchestrators so identical concurrent questions run the pipeline once
+_pipeline_flight = SingleFlight("pipeline")
+
+# Answer given without any LLM call when retrieval found no relevant context
+NO_CONTEXT_ANSWER = "I don't know."
+
+NO_CONTEXT_ANSWERS = REGISTRY.counter(
+    "rag_no_context_answers_total",
+    "Queries answered without generation because no relevant context was retrieved",
+)
+
+def search_chunks(
+    retriever: Retriever,
+    query: str,
+    only_latest: bool = False,
+    top_k: int = 5
+) -> List[RetrievedDocumentChunk]:
+    """
+    Retrieval only: the ``top_k`` most relevant chunks for a query, nearest first.
+
+    The query is decomposed like in RAGOrchestrator.run, and the chunks of
+    all sub-queries are merged and deduplicated. Needs only a retriever, so
+    no LLM client is created or called.
+    """
+
+    with span("rag_search"):
+        with span("query_analysis"):
+            sub_queries = generate_sub_queries(query)
+
+        with span("retrieval", sub_queries=len(sub_queries)):
+            retrieval_results = retriever.retrieve_many(
+                sub_queries,
+                top_k=max(10, top_k),
+                only_latest=only_latest,
+                max_chunks=top_k
+            )
+
+        with span("dedupe"):
+            chunks = [chunk for result in retrieval_results for chunk in result.chunks]
+            # Sort first so a chunk found by several sub-queries keeps its best distance
+            return dedupe_retrieved_chunks(filter_top_k_chunks(chunks, k=len(chunks)))[:top_k]
+
+
 class RAGOrchestrator:
     """
     Responsible for coordinating the RAG pipeline:
     - Query analysis
     - Retrieval
+    - Reranking
     - Context assembly
     - Generation
     - Confidence computation
@@ -25,10 +77,17 @@ class RAGOrchestrator:
     - Ingest data
     """
 
-    def __init__(self):
-        self.retriever = Retriever()
-        self.generator = Generator()
-        self.evaluator = ResponseEvaluator()
+    def __init__(
+        self,
+        retriever: Optional[Retriever] = None,
+        generator: Optional[Generator] = None,
+        evaluator: Optional[ResponseEvaluator] = None,
+        reranker: Optional[Reranker] = None
+    ):
+        self.retriever = retriever or Retriever()
+        self.generator = generator or Generator()
+        self.evaluator = evaluator or ResponseEvaluator()
+        self.reranker = reranker or get_reranker()
 
     def run(
         self,
@@ -36,21 +95,189 @@ class RAGOrchestrator:
         only_latest: bool = False,
         debug: bool = False
     ) -> str:
+        """
+        Answers a query.
+
+        Concurrent calls with the same normalized query and only_latest share
+        one pipeline run. The pipeline always builds the debug payload so a
+        shared run can serve both debug and non-debug callers.
+        """
+
+        key = (normalize_query(query), only_latest)
+        result, shared = _pipeline_flight.do(key, lambda: self._run(query, only_latest))
+        if shared:
+            logger.info(f"Coalesced with an in-flight identical query: {query}")
+
+        if not debug:
+            return {field: result[field] for field in ("answer", "citations", "confidence")}
+        if not shared:
+            return {**result, "debug": {**result["debug"], "coalesced": False}}
+
+        # The pipeline ran in the leader's trace: report this caller's own trace, matching its traceparent header
+        trace = current_trace()
+        debug_payload = {
+            **result["debug"],
+            "coalesced": True,
+            "trace_id": trace.trace_id if trace else None,
+            "timings": trace.timings() if trace else [],
+            "leader_trace_id": result["debug"]["trace_id"],
+            "leader_timings": result["debug"]["timings"],
+        }
+        return {**result, "debug": debug_payload}
+
+
+    def _run(self, query: str, only_latest: bool) -> Dict[str, Any]:
+
+        with span("rag_pipeline"):
+            # STEP 1: DECOMPOSE THE QUERY INTO SUB-QUERIES
+            with span("query_analysis"):
+                sub_queries = generate_sub_queries(query)
+            logger.info(f"Sub-queries generated = {len(sub_queries)}")
+
+            # STEP 2: RETRIEVE THE CHUNKS FOR EACH SUB-QUERY
+            with span("retrieval", sub_queries=len(sub_queries)):
+                retrieval_results = self.retriever.retrieve_many(
+                    sub_queries,
+                    only_latest=only_latest,
+                    **self._retrieval_limits()
+                )
+
+            return self._answer(query, sub_queries, retrieval_results, only_latest, debug=True)
+
+
+    def search(
+        self,
+        query: str,
+        only_latest: bool = False,
+        top_k: int = 5
+    ) -> List[RetrievedDocumentChunk]:
+        """Retrieval only, see search_chunks."""
+
+        return search_chunks(self.retriever, query, only_latest, top_k)
+
+
+    def run_batch(
+        self,
+        queries: List[str],
+        only_latest: bool = False,
+        debug: bool = False,
+        max_concurrency: int = 4
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs many queries through one pipeline pass.
+
+        Sub-queries of all queries are embedded and searched together,
+        then generation and evaluation run with at most ``max_concurrency``
+        queries in flight. Results are returned in input order; a failure
+        of one query is reported in its item and does not fail the batch.
+        """
+
+        with span("rag_batch", queries=len(queries)):
+            return self._run_batch(queries, only_latest, debug, max_concurrency)
+
+
+    def _run_batch(
+        self,
+        queries: List[str],
+        only_latest: bool,
+        debug: bool,
+        max_concurrency: int
+    ) -> List[Dict[str, Any]]:
+
+        with span("query_analysis", queries=len(queries)):
+            sub_queries_per_query = [generate_sub_queries(query) for query in queries]
+        unique_sub_queries = list(dict.fromkeys(
+            sub_query for sub_queries in sub_queries_per_query for sub_query in sub_queries
+        ))
+        logger.info(f"Batch of {len(queries)} queries. Unique sub-queries = {len(unique_sub_queries)}")
+
+        try:
+            with span("retrieval", sub_queries=len(unique_sub_queries)):
+                retrieval_results = self.retriever.retrieve_many(
+                    unique_sub_queries,
+                    only_latest=only_latest,
+                    **self._retrieval_limits()
+                )
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            return [
+                {"index": i, "query": query, "result": None, "error": str(e)}
+                for i, query in enumerate(queries)
+            ]
+        retrieval_by_sub_query = dict(zip(unique_sub_queries, retrieval_results))
+
+        # Each item gets its own trace object continuing the batch trace, so
+        # its debug timings only contain its own spans
+        batch_span = current_span()
+        batch_traceparent = format_traceparent(batch_span.trace_id, batch_span.span_id) if batch_span else None
+
+        def answer(index: int) -> Dict[str, Any]:
+            query = queries[index]
+            sub_queries = sub_queries_per_query[index]
+            try:
+                with start_trace(batch_traceparent), span("batch_item", index=index):
+                    result = self._answer(
+                        query,
+                        sub_queries,
+                        [retrieval_by_sub_query[sub_query] for sub_query in sub_queries],
+                        only_latest,
+                        debug
+                    )
+                return {"index": index, "query": query, "result": result, "error": None}
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}")
+                return {"index": index, "query": query, "result": None, "error": str(e)}
+
+        # Worker threads do not inherit context variables; give each item a copy
+        contexts = [copy_context() for _ in queries]
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            return list(executor.map(lambda index: contexts[index].run(answer, index), range(len(queries))))
+
+
+    def _retrieval_limits(self) -> Dict[str, int]:
+        """Per sub-query retrieval limits: reranking needs a wider candidate pool."""
+
+        if self.reranker.strategy == "none":
+            return {}
+        return {"top_k": max(10, self.reranker.candidate_pool), "max_chunks": self.reranker.candidate_pool}
+
+
+    def _reserved_chunks(
+        self,
+        sub_query_results: List[RetrievalResult],
+        deduplicated_chunks: List[RetrievedDocumentChunk]
+    ) -> List[RetrievedDocumentChunk]:
+        """The best chunks of each sub-query, which reranking must keep so no sub-query goes unanswered."""
+
+        if len(sub_query_results) < 2 or self.reranker.min_per_sub_query <= 0:
+            return []
+        by_key = {_chunk_key(chunk): chunk for chunk in deduplicated_chunks}
+        best = [
+            chunk
+            for result in sub_query_results
+            for chunk in filter_top_k_chunks(result.chunks, k=self.reranker.min_per_sub_query)
+        ]
+        return [by_key[key] for key in dict.fromkeys(_chunk_key(chunk) for chunk in best)]
+
+
+    def _answer(
+        self,
+        query: str,
+        sub_queries: List[str],
+        sub_query_results: List[RetrievalResult],
+        only_latest: bool,
+        debug: bool
+    ) -> Dict[str, Any]:
+        """Runs the pipeline from the retrieved chunks of each sub-query to the final answer."""
 
         debug_payload = {
             "query": query,
             "only_latest": only_latest,
             "sub_queries": []
         }
-        
-        # STEP 1: DECOMPOSE THE QUERY INTO SUB-QUERIES
-        sub_queries = generate_sub_queries(query)
-        logger.info(f"Sub-queries generated = {len(sub_queries)}")
-        
-        # STEP 2: RETRIEVE THE CHUNKS FOR EACH SUB-QUERY
+
         retrieval_results = []
-        for sub_query in sub_queries:
-            retrieval_result = self.retriever.retrieve(sub_query, only_latest=only_latest)
+        for sub_query, retrieval_result in zip(sub_queries, sub_query_results):
             logger.info(f"Retrieved {len(retrieval_result.chunks)} chunks for sub-query: {sub_query}")
             retrieval_results.extend(retrieval_result.chunks)
             debug_payload["sub_queries"].append(DebugUtils.calc_debug_metrics_for_sub_query(sub_query, retrieval_result))
@@ -59,43 +286,83 @@ class RAGOrchestrator:
         debug_payload["retrieved_chunks"] = len(retrieval_results)
 
         # STEP 3: DEDUPLICATE THE CHUNKS
-        deduplicated_retrieval_chunks = dedupe_retrieved_chunks(retrieval_results)
+        with span("dedupe"):
+            deduplicated_retrieval_chunks = dedupe_retrieved_chunks(retrieval_results)
         logger.info(f"Deduplicated chunks = {len(deduplicated_retrieval_chunks)}")
         
         debug_payload["deduplicated_chunks"] = len(deduplicated_retrieval_chunks)
+
+        # STEP 4: RERANK THE CHUNKS INTO THE FINAL CONTEXT
+        with span("rerank", strategy=self.reranker.strategy):
+            reserved = self._reserved_chunks(sub_query_results, deduplicated_retrieval_chunks)
+            context_chunks = self.reranker.rerank(query, deduplicated_retrieval_chunks, reserved)
+        logger.info(f"Reranked chunks = {len(context_chunks)}")
+
+        debug_payload["reranked_chunks"] = len(context_chunks)
         
-        # STEP 4: GENERATE THE ANSWER
-        response = self.generator.generate_response(deduplicated_retrieval_chunks, sub_queries)
+        # Nothing relevant was retrieved: the prompt would only ask the LLM to
+        # say it doesn't know, so answer directly without generation or evaluation
+        if not context_chunks:
+            NO_CONTEXT_ANSWERS.inc()
+            logger.info("No relevant context retrieved. Skipping generation and evaluation.")
+            if not debug:
+                return {"answer": NO_CONTEXT_ANSWER, "citations": [], "confidence": compute_confidence([])}
+            trace = current_trace()
+            debug_payload["input_tokens"] = 0
+            debug_payload["output_tokens"] = 0
+            debug_payload["model"] = None
+            debug_payload["short_circuit"] = "no_context"
+            debug_payload["trace_id"] = trace.trace_id if trace else None
+            debug_payload["timings"] = trace.timings() if trace else []
+            return {
+                "answer": NO_CONTEXT_ANSWER,
+                "citations": [],
+                "confidence": compute_confidence([]),
+                "debug": debug_payload,
+                "evaluation": None
+            }
+
+        # STEP 5: GENERATE THE ANSWER
+        with span("generation"):
+            response, cached = self.generator.generate(context_chunks, sub_queries)
         answer = response.choices[0].message.content.strip()
         
         input_tokens = response.usage.prompt_tokens
         output_tokens = response.usage.completion_tokens
         model_used = response.model
-        logger.info(f"Generated answer for the query.\nModel = {model_used}. Input tokens = {input_tokens}. Output tokens = {output_tokens}")
+        logger.info(f"Generated answer for the query.\nModel = {model_used}. Input tokens = {input_tokens}. Output tokens = {output_tokens}. Cached = {cached}")
 
-        debug_payload["input_tokens"] = input_tokens
-        debug_payload["output_tokens"] = output_tokens
+        # A cached answer costs nothing: its tokens are reported separately
+        debug_payload["input_tokens"] = 0 if cached else input_tokens
+        debug_payload["output_tokens"] = 0 if cached else output_tokens
+        debug_payload["cached"] = cached
+        debug_payload["cached_input_tokens"] = input_tokens if cached else 0
+        debug_payload["cached_output_tokens"] = output_tokens if cached else 0
         debug_payload["model"] = model_used
 
-        # STEP 5: COMPUTE THE CITATIONS
+        # STEP 6: COMPUTE THE CITATIONS
         citations = [
             {
                 "source": chunk.chunk.source,
                 "chunk_index": chunk.chunk.metadata["chunk_index"]
             }
-            for chunk in deduplicated_retrieval_chunks
+            for chunk in context_chunks
         ]
 
-        # STEP 6: COMPUTE THE CONFIDENCE
-        scores = [chunk.distance for chunk in deduplicated_retrieval_chunks]
+        # STEP 7: COMPUTE THE CONFIDENCE
+        scores = [chunk.distance for chunk in context_chunks]
         confidence = compute_confidence(scores)
 
-        # STEP 7: EVALUATE THE ANSWER
-        evaluation_response_model = self.evaluator.evaluate(query, deduplicated_retrieval_chunks, answer)
+        # STEP 8: EVALUATE THE ANSWER
+        with span("evaluation"):
+            evaluation_response_model = self.evaluator.evaluate(query, context_chunks, answer)
         evaluation_result = evaluation_response_model.model_dump_json(indent=4)
         
-        # STEP 8: RETURN THE ANSWER, CITATIONS, AND CONFIDENCE
+        # STEP 9: RETURN THE ANSWER, CITATIONS, AND CONFIDENCE
         if debug:
+            trace = current_trace()
+            debug_payload["trace_id"] = trace.trace_id if trace else None
+            debug_payload["timings"] = trace.timings() if trace else []
             return {
                 "answer": answer,
                 "citations": citations,
@@ -109,3 +376,8 @@ class RAGOrchestrator:
                 "citations": citations,
                 "confidence": confidence
             }
+
+
+def _chunk_key(chunk: RetrievedDocumentChunk):
+    # Same identity as dedupe_retrieved_chunks
+    return chunk.chunk.source, (chunk.chunk.metadata or {}).get("chunk_index")
@@ -1,66 +1,125 @@
 import re
-from typing import List
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Words that open a new question or request. A conjunction only separates two
+# sub-queries when one of these follows it; otherwise it joins noun phrases
+# ("pros and cons of X", "FastAPI and Flask") that belong to a single retrieval.
+_CLAUSE_OPENERS = (
+    "what", "how", "why", "when", "where", "which", "who", "whom", "whose",
+    "is", "are", "was", "were", "does", "do", "did", "can", "could", "should", "would", "will",
+    "explain", "describe", "list", "compare", "show", "give", "tell", "define",
+)
+
+_QUESTION_SPLIT_RE = re.compile(r"(?<=\?)\s*")
+
+_OPENER = r"(?:" + "|".join(_CLAUSE_OPENERS) + r")\s+\w"
+
+_CLAUSE_SPLIT_RE = re.compile(r"\s*(?:;\s*|,?\s+(?:and|also|but|plus)\s+)(?=" + _OPENER + ")", re.IGNORECASE)
+
+# A bare comma also introduces phrases ("In FastAPI, how ...", "If I use BAML, what ..."),
+# so it only separates two clauses that are each a question or request of their own
+_COMMA_SPLIT_RE = re.compile(r",\s+(?=" + _OPENER + ")", re.IGNORECASE)
+_OPENER_START_RE = re.compile(_OPENER, re.IGNORECASE)
+
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s?.!,;]+$")
+
+# Number of distinct queries whose analysis is kept
+ANALYSIS_CACHE_SIZE = 4096
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for identity checks: case-folded, trimmed, single-spaced."""
+    return _WHITESPACE_RE.sub(" ", query).strip().casefold()
 
 def generate_sub_queries(query: str) -> List[str]:
     """Generates sub-queries based on the main query.
-    
+
     Splits queries that contain:
-    - Multiple question marks (?)
-    - Conjunctions like "and", "how", "why"
-    
+    - Multiple questions, each ending with a question mark (?)
+    - Clauses joined by "and", "also", "but", "plus" or semicolons, when the
+      next clause starts with a question word ("how", "why", "what", "is",
+      ...) or a request ("explain", "list", ...) followed by more words
+    - Clauses separated by a comma, when both start that way
+
+    Coordinated noun phrases such as "pros and cons of X" or "X and Y", and
+    introductory phrases such as "In FastAPI, how ...", are kept in one
+    sub-query. Results are memoized per query.
+
     Args:
         query: The input query string
-        
+
     Returns:
         List of sub-queries
-        
+
     Example:
         "What is X and why use it?" -> ["What is X?", "Why use it?"]
+        "What are the pros and cons of X?" -> ["What are the pros and cons of X?"]
     """
     if not query or not query.strip():
         return [query] if query else []
-    
-    query = query.strip()
-    
-    # Check for multiple question marks
-    question_count = query.count('?')
-    if question_count > 1:
-        # Split by question marks and filter out empty strings
-        sub_queries = [q.strip() + '?' for q in query.split('?') if q.strip()]
-        return sub_queries
-    
-    # Check for conjunctions that indicate multiple questions
-    # Split on all "and" conjunctions (case-insensitive)
-    parts = re.split(r'\s+and\s+', query, flags=re.IGNORECASE)
-    
-    if len(parts) > 1:
-        sub_queries = []
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            
-            # Capitalize first letter if it's not already capitalized
-            if part and not part[0].isupper():
-                part = part[0].upper() + part[1:]
-            
-            # Ensure it ends with ?
-            if not part.endswith('?'):
-                part += '?'
-            
-            sub_queries.append(part)
-        
-        if len(sub_queries) > 1:
-            return sub_queries
-    
-    # Check for "how" or "why" in the middle (not at start)
-    # This handles cases like "What is X? How does it work?"
-    if re.search(r'\?.*\b(how|why)\s+', query, re.IGNORECASE):
-        # Already handled by multiple ? check above
-        pass
-    
-    # No splitting needed, return original query
-    return [query]
+
+    return list(_analyze(_WHITESPACE_RE.sub(" ", query).strip()))
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze(query: str) -> Tuple[str, ...]:
+
+    sub_queries = []
+    for question in _QUESTION_SPLIT_RE.split(query):
+        for clause in _clauses(question):
+            clause = _TRAILING_PUNCTUATION_RE.sub("", clause)
+            if clause:
+                sub_queries.append(clause[0].upper() + clause[1:] + "?")
+
+    if len(sub_queries) <= 1:
+        # No splitting needed, return original query
+        return (query,)
+
+    # The same question asked twice needs only one retrieval
+    return tuple(dict.fromkeys(sub_queries))
+
+
+def _clauses(question: str) -> List[str]:
+    clauses = []
+    for clause in _CLAUSE_SPLIT_RE.split(question):
+        parts = _COMMA_SPLIT_RE.split(clause)
+        merged = [parts[0]]
+        for part in parts[1:]:
+            if _OPENER_START_RE.match(merged[-1]):
+                merged.append(part)
+            else:
+                merged[-1] = f"{merged[-1]}, {part}"
+        clauses.extend(merged)
+    return clauses
+
+
+def merge_near_duplicates(embeddings: Sequence[Sequence[float]], min_similarity: float) -> List[int]:
+    """
+    Maps each sub-query to the first earlier sub-query whose embedding has a
+    cosine similarity of at least ``min_similarity`` with its own, or to
+    itself. Sub-queries mapped to another one need no search of their own.
+    """
+
+    if len(embeddings) < 2:
+        return list(range(len(embeddings)))
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarities = vectors @ vectors.T
+
+    representatives = []
+    for i in range(len(vectors)):
+        representatives.append(next(
+            (j for j in range(i) if representatives[j] == j and similarities[i, j] >= min_similarity),
+            i
+        ))
+    return representatives
 
 
 if __name__ == "__main__":
@@ -80,10 +139,16 @@ if __name__ == "__main__":
 
         # Test 5: Simple query (should not split)
         "What is a vector database?",
+
+        # Test 6: Coordinated noun phrase (should not split)
+        "What are the pros and cons of pgvector?",
+
+        # Test 7: Compound question joined by a comma
+        "What is BAML, how does it parse outputs?",
     ]
 
     for query in queries:
         sub_queries = generate_sub_queries(query)
         print(f"Query: {query}")
         print(f"Sub-queries: {sub_queries}")
-        print("-" * 100)
\ No newline at end of file
+        print("-" * 100)
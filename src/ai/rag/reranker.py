@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Literal, Optional, Sequence
+
+import numpy as np
+
+from src.ai.rag.models import RetrievedDocumentChunk
+from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+
+logger = getLogger(__name__)
+
+RERANK_FALLBACKS = REGISTRY.counter(
+    "rag_rerank_fallbacks_total",
+    "Reranks that fell back to a cheaper ordering",
+    ("strategy", "reason"),
+)
+
+RerankStrategy = Literal["none", "mmr", "cross_encoder"]
+
+# Default time budgets. MMR over 20 candidates takes well under 1 ms (benchmarks.rerank); the
+# cross-encoder needs a forward pass per candidate pair, tens to hundreds of ms on CPU
+DEFAULT_TIME_BUDGET_MS = {"none": 0.0, "mmr": 50.0, "cross_encoder": 500.0}
+
+
+class Reranker:
+    """
+    Responsible only for choosing and ordering the context chunks:
+    - Keeping the reserved chunks plus the ``candidate_pool`` nearest of the rest,
+      across all sub-queries, as candidates
+    - Dropping near-duplicates (e.g. the same chunk from repeated ingestions)
+    - Ordering by maximal marginal relevance (MMR) or a local cross-encoder
+    - Returning at most ``top_n`` chunks, plus any reserved chunks beyond that
+
+    Reserved chunks (the orchestrator reserves the ``min_per_sub_query``
+    best chunks of each sub-query, so no sub-query is crowded out) are
+    always kept, first; the others are chosen to fill up to ``top_n``.
+
+    MMR scores relevance as ``1 - distance`` and redundancy as the highest
+    cosine similarity to an already selected chunk, in one NumPy matrix
+    product. The cross-encoder runs on its own worker thread; if it does not
+    finish within ``time_budget_ms`` the MMR order is used instead, with a
+    budget of its own.
+    """
+
+    def __init__(
+        self,
+        strategy: RerankStrategy = "mmr",
+        candidate_pool: int = 20,
+        top_n: int = 8,
+        min_per_sub_query: int = 2,
+        mmr_lambda: float = 0.7,
+        duplicate_similarity: float = 0.97,
+        time_budget_ms: Optional[float] = None,
+        cross_encoder_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+    ):
+        if strategy not in ("none", "mmr", "cross_encoder"):
+            raise ValueError(f"Unknown rerank strategy: {strategy}")
+
+        self.strategy = strategy
+        self.candidate_pool = candidate_pool
+        self.top_n = top_n
+        self.min_per_sub_query = min_per_sub_query
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_similarity = duplicate_similarity
+        self.time_budget = (DEFAULT_TIME_BUDGET_MS[strategy] if time_budget_ms is None else time_budget_ms) / 1000
+        self.mmr_time_budget = DEFAULT_TIME_BUDGET_MS["mmr"] / 1000
+        self.batch_size = batch_size
+        self.cross_encoder = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        if strategy == "cross_encoder":
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError(
+                    "The cross-encoder reranker requires sentence-transformers: pip install sentence-transformers"
+                ) from e
+            self.cross_encoder = CrossEncoder(cross_encoder_model, device="cpu")
+            # A single worker: inference is batched, and concurrent calls would only contend for the CPU
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+    def rerank(
+        self,
+        query: str,
+        chunks: List[RetrievedDocumentChunk],
+        reserved: Sequence[RetrievedDocumentChunk] = ()
+    ) -> List[RetrievedDocumentChunk]:
+        """Returns the chunks to use as context, best first. ``reserved`` must be taken from ``chunks``."""
+
+        if self.strategy == "none" or not chunks:
+            return chunks
+
+        start = time.perf_counter()
+        reserved_ids = {id(chunk) for chunk in reserved}
+        others = sorted((chunk for chunk in chunks if id(chunk) not in reserved_ids), key=lambda chunk: chunk.distance)
+        candidates = list(reserved) + others[:self.candidate_pool]
+        seeds = list(range(len(reserved)))
+        if any(chunk.embedding is None for chunk in candidates):
+            RERANK_FALLBACKS.inc(strategy=self.strategy, reason="missing_embeddings")
+            return candidates[:max(self.top_n, len(seeds))]
+
+        relevance = 1.0 - np.fromiter((chunk.distance for chunk in candidates), dtype=np.float32, count=len(candidates))
+        vectors = np.stack([np.frombuffer(chunk.embedding, dtype=np.float32) for chunk in candidates])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        similarities = vectors @ vectors.T
+
+        if self.strategy == "cross_encoder":
+            scores = self._cross_encoder_scores(query, candidates, start + self.time_budget)
+            if scores is not None:
+                order = seeds + self._without_duplicates(np.argsort(-scores), similarities, seeds)
+                return [candidates[i] for i in order[:max(self.top_n, len(seeds))]]
+            # The cross-encoder used up its own budget; MMR gets a fresh one
+            deadline = time.perf_counter() + self.mmr_time_budget
+        else:
+            deadline = start + self.time_budget
+
+        return [candidates[i] for i in self._mmr(relevance, similarities, deadline, seeds)]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _mmr(self, relevance: np.ndarray, similarities: np.ndarray, deadline: float, seeds: List[int]) -> List[int]:
+        """Greedy MMR selection, after the seeds, of up to top_n indices, skipping near-duplicates."""
+
+        count = len(relevance)
+        selected = []
+        available = np.ones(count, dtype=bool)
+        max_similarity = np.zeros(count, dtype=np.float32)
+
+        def select(index: int) -> None:
+            selected.append(index)
+            available[index] = False
+            np.logical_and(available, similarities[index] < self.duplicate_similarity, out=available)
+            np.maximum(max_similarity, similarities[index], out=max_similarity)
+
+        for seed in seeds:
+            select(seed)
+
+        while len(selected) < self.top_n and available.any():
+            if time.perf_counter() > deadline:
+                RERANK_FALLBACKS.inc(strategy="mmr", reason="time_budget")
+                remaining = [i for i in np.argsort(-relevance) if available[i]]
+                selected.extend(self._without_duplicates(remaining, similarities, selected)[:self.top_n - len(selected)])
+                break
+
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * max_similarity
+            scores[~available] = -np.inf
+            select(int(np.argmax(scores)))
+
+        return selected
+
+    def _without_duplicates(self, order, similarities: np.ndarray, selected: Optional[List[int]] = None) -> List[int]:
+        kept = list(selected or [])
+        for i in order:
+            i = int(i)
+            if all(similarities[i, j] < self.duplicate_similarity for j in kept):
+                kept.append(i)
+        return kept[len(selected or []):]
+
+    def _cross_encoder_scores(
+        self,
+        query: str,
+        candidates: List[RetrievedDocumentChunk],
+        deadline: float
+    ) -> Optional[np.ndarray]:
+        pairs = [(query, chunk.chunk.content) for chunk in candidates]
+        future = self._executor.submit(self.cross_encoder.predict, pairs, batch_size=self.batch_size)
+        try:
+            return np.asarray(future.result(timeout=max(0.0, deadline - time.perf_counter())), dtype=np.float32)
+        except FutureTimeoutError:
+            # The running inference cannot be interrupted; it finishes in the background
+            future.cancel()
+            RERANK_FALLBACKS.inc(strategy="cross_encoder", reason="time_budget")
+            logger.warning("Cross-encoder rerank exceeded its time budget, using MMR order")
+        except Exception as e:
+            RERANK_FALLBACKS.inc(strategy="cross_encoder", reason="error")
+            logger.error(f"Cross-encoder rerank failed, using MMR order: {e}")
+        return None
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def create_reranker() -> Reranker:
+    """
+    Builds the reranker from RAG_RERANKER ("mmr" by default, "cross_encoder"
+    or "none"), RAG_RERANK_CANDIDATES, RAG_RERANK_TOP_N,
+    RAG_RERANK_MIN_PER_SUB_QUERY, RAG_RERANK_MMR_LAMBDA,
+    RAG_RERANK_TIME_BUDGET_MS (default per strategy) and RAG_RERANK_MODEL.
+    """
+
+    time_budget_ms = os.getenv("RAG_RERANK_TIME_BUDGET_MS")
+    return Reranker(
+        strategy=os.getenv("RAG_RERANKER", "mmr"),
+        candidate_pool=int(os.getenv("RAG_RERANK_CANDIDATES", "20")),
+        top_n=int(os.getenv("RAG_RERANK_TOP_N", "8")),
+        min_per_sub_query=int(os.getenv("RAG_RERANK_MIN_PER_SUB_QUERY", "2")),
+        mmr_lambda=float(os.getenv("RAG_RERANK_MMR_LAMBDA", "0.7")),
+        time_budget_ms=float(time_budget_ms) if time_budget_ms else None,
+        cross_encoder_model=os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    )
+
+
+def get_reranker() -> Reranker:
+    """Returns the process-wide reranker, creating it on first use."""
+
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = create_reranker()
+        return _reranker
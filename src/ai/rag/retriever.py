@@ -1,15 +1,30 @@
+from src.ai.rag.embeddings import (
+    EmbeddingMismatchError,
+    EmbeddingProvider,
+    LEGACY_EMBEDDING_DIMENSION,
+    LEGACY_EMBEDDING_MODEL,
+    get_embedding_provider,
+)
 from src.ai.rag.models import RetrievalResult
 from src.ai.rag.models import DocumentChunk, RetrievedDocumentChunk
-from src.db.connection import conn
+from src.ai.rag.query_analyzer import merge_near_duplicates
+from src.ai.rag.utils.limits import stage_limiter
+from src.ai.rag.utils.singleflight import SingleFlight
+from src.db.connection import get_pool
+from src.utils.tracing import span
 
-from openai import OpenAI
-from pgvector.psycopg import Vector
+from array import array
 from psycopg import Cursor
-from dotenv import load_dotenv
 import json
-from typing import List, Tuple, Any
+import os
+import numpy as np
+from typing import List, Tuple, Any, Optional
 
-load_dotenv()
+# Shared by all retrievers so identical concurrent embedding requests run once
+_embedding_flight = SingleFlight("embedding")
+
+# Queries whose embeddings are at least this similar share one search; unset disables merging
+_MERGE_SIMILARITY = os.getenv("RAG_SUBQUERY_MERGE_SIMILARITY")
 
 
 class Retriever:
@@ -17,73 +32,175 @@ class Retriever:
     Responsible only for retrieving relevant document chunks.
     """
 
-    def __init__(self):
-        self.client = OpenAI()
+    def __init__(
+        self,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        merge_similarity: Optional[float] = float(_MERGE_SIMILARITY) if _MERGE_SIMILARITY else None
+    ):
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        self.merge_similarity = merge_similarity
 
     def retrieve(self, query: str, top_k: int = 10, only_latest = False) -> RetrievalResult:
-        """Retrieves the relevant document chunks using the OpenAI API."""
+        """Retrieves the relevant document chunks for a query."""
+
+        return self.retrieve_many([query], top_k=top_k, only_latest=only_latest)[0]
+
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 10,
+        only_latest = False,
+        max_chunks: int = 5
+    ) -> List[RetrievalResult]:
+        """
+        Retrieves the relevant document chunks for several queries at once.
 
-        query_embedding = self.client.embeddings.create(
-            input=query,
-            model="text-embedding-3-small"
-        ).data[0].embedding
+        All queries are embedded with a single embeddings request and the
+        vector searches are sent to the database in one pipeline. Results
+        are returned in the same order as the queries, each holding at most
+        ``max_chunks`` of its ``top_k`` nearest chunks that pass the relevance
+        threshold.
 
+        With ``merge_similarity`` set, queries whose embeddings are near
+        duplicates of an earlier query are not searched again and share its
+        result.
 
-        with conn.cursor() as cursor:
+        Only ingestions embedded with the configured embedding model are
+        searched; EmbeddingMismatchError is raised if there are none.
+        """
+
+        if not queries:
+            return []
 
-            retrieval_query, query_params = self._get_retrieval_query(
-                cursor,
-                only_latest,
-                query_embedding,
-                top_k
+        with span("embedding", count=len(queries)):
+            query_embeddings, _ = _embedding_flight.do(
+                (self.embedding_provider.model, tuple(queries)),
+                lambda: self._embed(queries)
             )
-                
-            chunks = self._fetch_top_k_chunks(cursor, retrieval_query, query_params)
 
-        relevant_or_capped_chunks = self._apply_relevance_or_capped_filter(chunks)
+        if self.merge_similarity is None:
+            representatives = list(range(len(queries)))
+        else:
+            representatives = merge_near_duplicates(query_embeddings, self.merge_similarity)
+        searched = sorted(set(representatives))
 
-        return RetrievalResult(chunks=relevant_or_capped_chunks)
+        with stage_limiter.limit("db"):
+            results = self._search([query_embeddings[i] for i in searched], top_k, only_latest, max_chunks)
+        result_by_query = dict(zip(searched, results))
+        return [result_by_query[representative] for representative in representatives]
 
 
-    def _get_retrieval_query(
+    def _embed(self, queries: List[str]) -> List[array]:
+
+        with stage_limiter.limit("embedding"):
+            return self.embedding_provider.embed(queries)
+
+
+    def _search(
         self,
-        cursor: Cursor,
+        query_embeddings: List[array],
+        top_k: int,
         only_latest: bool,
-        query_embedding: List[float],
-        top_k: int
-    ) -> Tuple[str, List[Any]]:
+        max_chunks: int
+    ) -> List[RetrievalResult]:
+        """Runs the vector searches for already embedded queries in one pipeline."""
+
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                ingestion_ids = self._get_search_scope(cursor, only_latest)
+            if ingestion_ids == []:
+                # Nothing ingested yet: no context, answered as such rather than as an error
+                return [RetrievalResult(chunks=[]) for _ in query_embeddings]
+
+            cursors = []
+            with conn.pipeline():
+                for query_embedding in query_embeddings:
+                    retrieval_query, query_params = self._get_retrieval_query(
+                        ingestion_ids,
+                        query_embedding,
+                        top_k
+                    )
+                    cursor = conn.cursor()
+                    cursor.execute(retrieval_query, query_params)
+                    cursors.append(cursor)
+
+                results = []
+                # Searches are sent together, so the first fetch also waits for the round trip
+                for index, cursor in enumerate(cursors):
+                    with span("db_search", index=index), cursor:
+                        chunks = self._fetch_top_k_chunks(cursor)
+                    relevant_or_capped_chunks = self._apply_relevance_or_capped_filter(chunks, max_chunks=max_chunks)
+                    results.append(RetrievalResult(chunks=relevant_or_capped_chunks))
+
+        return results
+
+
+    def _get_search_scope(self, cursor: Cursor, only_latest: bool) -> Optional[List[str]]:
+        """
+        Returns the ingestion ids to search, or None to search every ingestion.
+        The list is empty when nothing has been ingested yet.
 
-        latest_ingestion_id = None
-        if only_latest:
-            cursor.execute(
-                "SELECT * FROM ingestion_metadata ORDER BY ingested_at DESC LIMIT 1"
+        Ingestions recorded without an embedding model predate per-ingestion
+        tracking and were embedded with the legacy model.
+        """
+
+        model = self.embedding_provider.model
+        dimension = self.embedding_provider.dimension
+
+        cursor.execute(
+            f"""
+            SELECT COALESCE(embedding_model, %s), COALESCE(embedding_dimension, %s), array_agg(ingestion_id::text)
+            FROM {"(SELECT * FROM ingestion_metadata ORDER BY ingested_at DESC LIMIT 1) latest" if only_latest else "ingestion_metadata"}
+            GROUP BY 1, 2
+            """,
+            (LEGACY_EMBEDDING_MODEL, LEGACY_EMBEDDING_DIMENSION)
+        )
+        groups = cursor.fetchall()
+        if not groups:
+            return []
+
+        matching = [ids for group_model, group_dimension, ids in groups if (group_model, group_dimension) == (model, dimension)]
+        if not matching:
+            indexed = ", ".join(f"{group_model} ({group_dimension})" for group_model, group_dimension, _ in groups) or "none"
+            raise EmbeddingMismatchError(
+                f"No {'latest ' if only_latest else ''}ingestion was embedded with {model} ({dimension}); indexed with: {indexed}"
             )
-            latest_ingestion_id = cursor.fetchone()[1]
+        if not only_latest and len(groups) == 1:
+            return None
+        return matching[0]
+
+
+    def _get_retrieval_query(
+        self,
+        ingestion_ids: Optional[List[str]],
+        query_embedding: array,
+        top_k: int
+    ) -> Tuple[str, List[Any]]:
 
         retrieval_query = f"""
         SELECT file_name, chunk_index, content, embedding, metadata, embedding <=> %s AS distance
         FROM file_chunks
-        {f"WHERE metadata->>'ingestion_id' = %s" if only_latest else ""}
+        {f"WHERE metadata->>'ingestion_id' = ANY(%s)" if ingestion_ids is not None else ""}
         ORDER BY distance ASC
         LIMIT %s
         """
-        if only_latest:
-            # Convert UUID to string for JSON comparison
-            query_params = (Vector(query_embedding), str(latest_ingestion_id), top_k)
+        from pgvector.psycopg import Vector
+
+        vector = Vector(np.frombuffer(query_embedding, dtype=np.float32))
+        if ingestion_ids is not None:
+            query_params = (vector, ingestion_ids, top_k)
         else:
-            query_params = (Vector(query_embedding), top_k)
+            query_params = (vector, top_k)
 
         return retrieval_query, query_params
 
 
     def _fetch_top_k_chunks(
         self,
-        cursor: Cursor,
-        retrieval_query: str,
-        query_params: Tuple[Any]
+        cursor: Cursor
     ) -> List[RetrievedDocumentChunk]:
 
-        cursor.execute(retrieval_query, query_params)
         fetched_chunks = cursor.fetchall()
 
         chunks = []
@@ -103,7 +220,8 @@ class Retriever:
                         source=chunk[0],   # file_name column
                         metadata={**metadata, "chunk_index": chunk[1]}
                     ),
-                    distance=float(chunk[5])  # distance column
+                    distance=float(chunk[5]),  # distance column
+                    embedding=array("f", chunk[3].tobytes()) if chunk[3] is not None else None  # embedding column
                 ))
         
         return chunks
@@ -112,11 +230,12 @@ class Retriever:
     def _apply_relevance_or_capped_filter(
         self,
         chunks: List[RetrievedDocumentChunk],
-        relevance_threshold_distance: float = 0.5
+        relevance_threshold_distance: float = 0.5,
+        max_chunks: int = 5
     ) -> List[RetrievedDocumentChunk]:
         """Applies the relevance filter to the chunks."""
 
         relevant_chunks = [chunk for chunk in chunks if chunk.distance < relevance_threshold_distance]
-        capped_chunks = sorted(relevant_chunks, key=lambda x: x.distance, reverse=False)[:5]
+        capped_chunks = sorted(relevant_chunks, key=lambda x: x.distance, reverse=False)[:max_chunks]
         return capped_chunks
 
@@ -1,7 +1,10 @@
 from typing import List, Literal
 
 def compute_confidence(scores: List[float]) -> Literal["low", "medium", "high"]:
-    """Computes the confidence level based on the scores."""
+    """Computes the confidence level based on the scores. No scores means no context: low."""
+
+    if not scores:
+        return "low"
 
     sorted_scores = sorted(scores, reverse=False)
 
@@ -0,0 +1,75 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from src.utils.metrics import REGISTRY
+
+STAGE_QUEUE_TIME = REGISTRY.histogram(
+    "rag_stage_queue_seconds",
+    "Time spent waiting for a stage concurrency slot",
+    ("stage",),
+)
+STAGE_IN_FLIGHT = REGISTRY.gauge(
+    "rag_stage_in_flight",
+    "Calls currently holding a stage concurrency slot",
+    ("stage",),
+)
+STAGE_REJECTED = REGISTRY.counter(
+    "rag_stage_rejected_total",
+    "Calls that gave up waiting for a stage concurrency slot",
+    ("stage",),
+)
+
+# Default concurrent calls per stage, overridable with RAG_MAX_CONCURRENT_<STAGE>
+DEFAULT_STAGE_LIMITS = {"embedding": 8, "db": 8, "llm": 8}
+
+
+class StageOverloaded(Exception):
+    """Raised when a stage slot could not be acquired in time."""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"The {stage} stage is overloaded, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    Bounds the number of concurrent calls to each external dependency.
+
+    Callers wait at most ``wait_timeout`` seconds for a slot, then fail fast
+    with StageOverloaded instead of piling up on a saturated dependency.
+    """
+
+    def __init__(self, limits: Dict[str, int], wait_timeout: float):
+        self.limits = limits
+        self.wait_timeout = wait_timeout
+        self.semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in limits.items()}
+
+    @contextmanager
+    def limit(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        acquired = self.semaphores[stage].acquire(timeout=self.wait_timeout)
+        STAGE_QUEUE_TIME.observe(time.perf_counter() - start, stage=stage)
+        if not acquired:
+            STAGE_REJECTED.inc(stage=stage)
+            raise StageOverloaded(stage, retry_after=max(1, math.ceil(self.wait_timeout)))
+
+        STAGE_IN_FLIGHT.inc(stage=stage)
+        try:
+            yield
+        finally:
+            STAGE_IN_FLIGHT.dec(stage=stage)
+            self.semaphores[stage].release()
+
+
+stage_limiter = StageLimiter(
+    limits={
+        stage: int(os.getenv(f"RAG_MAX_CONCURRENT_{stage.upper()}", str(default)))
+        for stage, default in DEFAULT_STAGE_LIMITS.items()
+    },
+    wait_timeout=float(os.getenv("RAG_STAGE_WAIT_TIMEOUT", "10")),
+)
@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from src.utils.metrics import REGISTRY
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "rag_singleflight_calls_total",
+    "Calls made through a single-flight group",
+    ("group",),
+)
+SINGLEFLIGHT_COALESCED = REGISTRY.counter(
+    "rag_singleflight_coalesced_total",
+    "Calls that waited for an identical in-flight call instead of running",
+    ("group",),
+)
+SINGLEFLIGHT_WAITERS = REGISTRY.gauge(
+    "rag_singleflight_waiters",
+    "Callers currently waiting for an identical in-flight call",
+    ("group",),
+)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception). Nothing is
+    cached once the call finishes. Shared results must be treated as
+    read-only by callers.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self.lock = threading.Lock()
+        self.calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Returns (result, shared), where shared is True if another caller's result was reused."""
+
+        SINGLEFLIGHT_CALLS.inc(group=self.group)
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+
+        if not leader:
+            SINGLEFLIGHT_COALESCED.inc(group=self.group)
+            SINGLEFLIGHT_WAITERS.inc(group=self.group)
+            try:
+                call.event.wait()
+            finally:
+                SINGLEFLIGHT_WAITERS.dec(group=self.group)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.calls)
@@ -1,11 +1,31 @@
 """FastAPI application setup and configuration."""
 
+import asyncio
+import contextlib
 import logging
+import os
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
-from src.api.routers import health, chat, ingestions
+from src.ai.rag.embeddings import get_embedding_provider
+from src.ai.rag.ingestion_jobs import ingestion_jobs
+from src.ai.rag.llm_cache import get_llm_cache
+from src.ai.rag.reranker import get_reranker
+from src.db.connection import close_pool, connect
+from src.db.retention import run_retention_periodically
+from src.db.schema import apply_schema
+from src.api.routers import health, chat, search, ingestions, metrics
+from src.api.middleware.admission import AdmissionMiddleware
 from src.api.middleware.cors import setup_cors
 from src.api.middleware.logging import LoggingMiddleware
+from src.api.middleware.tracing import TracingMiddleware
+from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
 
 # Configure logging
 logging.basicConfig(
@@ -13,40 +33,146 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+logger = getLogger(__name__)
+
+STARTUP_SECONDS = REGISTRY.gauge(
+    "rag_startup_seconds",
+    "Time this worker took to become ready, until its models were warmed up",
+)
+
+# Seconds between SIGTERM and the start of the graceful shutdown, while readiness already fails
+PRESTOP_SECONDS = float(os.getenv("RAG_PRESTOP_SECONDS", "5"))
+
+
+def _drain_on_sigterm(app: FastAPI, delay: float) -> None:
+    """
+    Marks the worker as draining as soon as SIGTERM arrives.
+
+    uvicorn stops accepting connections when it handles the signal, so its
+    handler is only called ``delay`` seconds later, giving load balancers
+    time to see readiness fail. A second SIGTERM shuts down immediately.
+    """
+    if delay <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+    server_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(server_handler):
+        return
+    loop = asyncio.get_running_loop()
+
+    def handle_sigterm(signum, frame):
+        if app.state.draining:
+            server_handler(signum, frame)
+            return
+        app.state.draining = True
+        logger.info(f"Worker {os.getpid()} draining, shutting down in {delay:.0f}s")
+        loop.call_soon_threadsafe(loop.call_later, delay, server_handler, signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown hooks.
+
+    Runs in every worker process after it has been started, so the database
+    pool, HTTP clients and caches below are created per worker.
+    """
+    started = time.perf_counter()
+    app.state.draining = False
+    _drain_on_sigterm(app, PRESTOP_SECONDS)
+    await run_in_threadpool(get_embedding_provider().warm_up)
+    # Loads the cross-encoder, when configured, before the first request
+    await run_in_threadpool(get_reranker)
+
+    # Scheduled retention; the policy itself comes from RAG_RETENTION_KEEP_* variables
+    retention_interval = float(os.getenv("RAG_RETENTION_INTERVAL_HOURS", "24")) * 3600
+    retention_task = asyncio.create_task(run_retention_periodically(retention_interval))
+
+    startup_seconds = time.perf_counter() - started
+    STARTUP_SECONDS.set(startup_seconds)
+    logger.info(f"Worker {os.getpid()} ready in {startup_seconds:.2f}s")
+
+    yield
+
+    # Already set on SIGTERM; covers shutdowns triggered otherwise (SIGINT, reload)
+    app.state.draining = True
+    retention_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await retention_task
+    # Stop background ingestions before the process exits
+    ingestion_jobs.shutdown()
+    get_embedding_provider().close()
+    get_reranker().close()
+    get_llm_cache().close()
+    close_pool()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="RAG Assistant API",
     description="Engineering Knowledge RAG Assistant API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Setup middleware
+# Middleware added last runs outermost. Admission runs inside CORS, so 429/503
+# responses carry CORS headers, and inside logging and tracing, so rejections are recorded
+app.add_middleware(AdmissionMiddleware)
 setup_cors(app)
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(health.router)
 app.include_router(chat.router)
+app.include_router(search.router)
 app.include_router(ingestions.router)
+app.include_router(metrics.router)
 
 
-def run_app(host: str = "0.0.0.0", port: int = 8000, reload: bool = False):
+def run_app(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    reload: bool = False,
+    workers: Optional[int] = None,
+    drain_timeout: Optional[float] = None,
+):
     """Run the FastAPI application using uvicorn.
     
     Args:
         host: Host to bind to
         port: Port to bind to
-        reload: Enable auto-reload for development
+        reload: Enable auto-reload for development (single process)
+        workers: Number of worker processes (RAG_WORKERS, default 1)
+        drain_timeout: Seconds in-flight requests get to finish on shutdown (RAG_DRAIN_TIMEOUT, default 30)
     """
     import uvicorn
+
+    if workers is None:
+        workers = int(os.getenv("RAG_WORKERS", "1"))
+    if drain_timeout is None:
+        drain_timeout = float(os.getenv("RAG_DRAIN_TIMEOUT", "30"))
+
+    # Once, before any worker starts; serving with `uvicorn src.api.app:app` needs `python -m src.db.schema` first
+    connection = connect()
+    try:
+        apply_schema(connection)
+    finally:
+        connection.close()
+
     uvicorn.run(
         "src.api.app:app",
         host=host,
         port=port,
         reload=reload,
+        workers=None if reload else workers,
+        timeout_graceful_shutdown=drain_timeout,
     )
 
 
 if __name__ == "__main__":
-    run_app(reload=True)
+    # Auto-reload for development; RAG_RELOAD=false serves with RAG_WORKERS processes
+    run_app(reload=os.getenv("RAG_RELOAD", "true").lower() == "true")
 
@@ -0,0 +1,207 @@
+"""Admission control middleware: concurrency limit, bounded queue and rate limiting."""
+
+import asyncio
+import json
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+
+logger = getLogger(__name__)
+
+ADMISSION_QUEUE_TIME = REGISTRY.histogram(
+    "rag_admission_queue_seconds",
+    "Time requests waited in the admission queue",
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "rag_admission_rejected_total",
+    "Requests rejected by admission control",
+    ("reason",),
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("rag_admission_in_flight", "Admitted requests currently running")
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("rag_admission_queue_depth", "Requests waiting for admission")
+
+
+class Rejected(Exception):
+    """Raised when a request is turned away; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Per-client token buckets refilled at ``rate`` tokens/s up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, client: str, cost: int = 1) -> float:
+        """
+        Takes ``cost`` tokens. Returns 0 if allowed, otherwise the seconds until they are available.
+
+        A request costing more than ``burst`` is allowed once the bucket is
+        full and leaves it in debt, so its items are still paid for.
+        """
+
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        required = min(cost, self.burst)
+        if tokens < required:
+            self.buckets[client] = (tokens, now)
+            return (required - tokens) / self.rate
+
+        self.buckets[client] = (tokens - cost, now)
+        if len(self.buckets) > self.max_clients:
+            self._evict_full(now)
+        return 0.0
+
+    def _evict_full(self, now: float) -> None:
+        # A bucket that has refilled completely carries no state worth keeping
+        refill_time = self.burst / self.rate
+        self.buckets = {
+            client: (tokens, updated)
+            for client, (tokens, updated) in self.buckets.items()
+            if now - updated < refill_time - tokens / self.rate
+        }
+
+
+class AdmissionController:
+    """
+    Admits at most ``max_concurrent`` requests at a time.
+
+    Further requests wait in a queue of at most ``max_queue``. A request is
+    rejected up front when the queue is full or when the estimated wait
+    (from the moving average of service times) exceeds its deadline, and
+    rejected later if it is still queued when the deadline passes.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.service_time = 1.0
+
+    def estimated_wait(self) -> float:
+        if not self.semaphore.locked():
+            return 0.0
+        return (self.waiting + 1) * self.service_time / self.max_concurrent
+
+    @asynccontextmanager
+    async def admit(self, deadline: Optional[float] = None):
+        deadline = min(deadline, self.queue_timeout) if deadline else self.queue_timeout
+        estimated_wait = self.estimated_wait()
+        if self.waiting >= self.max_queue:
+            raise Rejected(503, "queue_full", estimated_wait)
+        if estimated_wait > deadline:
+            raise Rejected(503, "deadline", estimated_wait)
+
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.set(self.waiting)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=deadline)
+        except TimeoutError:
+            raise Rejected(503, "queue_timeout", self.estimated_wait() or deadline)
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.set(self.waiting)
+            ADMISSION_QUEUE_TIME.observe(time.monotonic() - start)
+
+        ADMISSION_IN_FLIGHT.inc()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            # Exponential moving average of how long an admitted request holds its slot
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - started)
+            ADMISSION_IN_FLIGHT.dec()
+            self.semaphore.release()
+
+
+class AdmissionMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware applying admission control to the expensive endpoints.
+
+    Clients are rate limited by address (429); behind a proxy, run uvicorn
+    with --forwarded-allow-ips so the address is the client's. Requests to
+    ``batch_paths`` cost one token per query. Requests may send
+    X-Request-Timeout (seconds) to be rejected early when they cannot be
+    served in time (503). Both carry Retry-After. CORS preflights are not
+    limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Tuple[str, ...] = ("/api/v1/chat", "/api/v1/search"),
+        batch_paths: Tuple[str, ...] = ("/api/v1/chat/batch",),
+        max_concurrent: int = int(os.getenv("RAG_ADMISSION_MAX_CONCURRENT", "16")),
+        max_queue: int = int(os.getenv("RAG_ADMISSION_MAX_QUEUE", "64")),
+        queue_timeout: float = float(os.getenv("RAG_ADMISSION_QUEUE_TIMEOUT", "5")),
+        rate: float = float(os.getenv("RAG_RATE_LIMIT_PER_SECOND", "5")),
+        burst: int = int(os.getenv("RAG_RATE_LIMIT_BURST", "20")),
+    ):
+        super().__init__(app)
+        self.paths = paths
+        self.batch_paths = batch_paths
+        self.controller = AdmissionController(max_concurrent, max_queue, queue_timeout)
+        self.rate_limiter = TokenBucket(rate, burst)
+
+    async def dispatch(self, request: Request, call_next):
+        """Rate limit, queue and admit the request, or reject it with Retry-After."""
+        if request.method == "OPTIONS" or not request.url.path.startswith(self.paths):
+            return await call_next(request)
+
+        # Keyed on the address only: any client can set a header such as X-API-Key to a fresh value
+        client = request.client.host if request.client else "unknown"
+        try:
+            cost = await _batch_size(request) if request.url.path in self.batch_paths else 1
+            retry_after = self.rate_limiter.take(client, cost)
+            if retry_after:
+                raise Rejected(429, "rate_limited", retry_after)
+
+            async with self.controller.admit(_parse_timeout(request.headers.get("x-request-timeout"))):
+                return await call_next(request)
+        except Rejected as e:
+            ADMISSION_REJECTED.inc(reason=e.reason)
+            logger.warning(f"Rejected {request.method} {request.url.path} for {client}: {e.reason}")
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"detail": f"Request rejected: {e.reason}"},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+
+async def _batch_size(request: Request) -> int:
+    """Number of queries in a batch request body; malformed bodies cost 1 and fail validation later."""
+
+    try:
+        queries = json.loads(await request.body()).get("queries")
+    except (ValueError, AttributeError):
+        return 1
+    return max(1, len(queries)) if isinstance(queries, list) else 1
+
+
+def _parse_timeout(value: Optional[str]) -> Optional[float]:
+    try:
+        timeout = float(value) if value else None
+    except ValueError:
+        return None
+    return timeout if timeout and timeout > 0 else None
@@ -0,0 +1,40 @@
+"""Tracing middleware for per-request traces and latency metrics."""
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.utils.metrics import REGISTRY
+from src.utils.tracing import format_traceparent, span, start_trace
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ("method", "route", "status"),
+)
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware that starts a trace per request.
+
+    Continues the caller's trace when a W3C ``traceparent`` header is sent,
+    and returns the request's own ``traceparent`` in the response.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        """Trace the request and record its latency."""
+        with start_trace(request.headers.get("traceparent")) as trace:
+            with span("http_request", method=request.method, path=request.url.path) as request_span:
+                response = await call_next(request)
+
+        # Label by route template, not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            request_span.end - request_span.start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(response.status_code),
+        )
+        response.headers["traceparent"] = format_traceparent(trace.trace_id, request_span.span_id)
+
+        return response
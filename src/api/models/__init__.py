@@ -1,2 +1,28 @@
 """Models module for Pydantic schemas and data models."""
 
+from .chat import ChatBatchItem, ChatBatchRequest, ChatBatchResponse
+from .ingestions import (
+    IngestionJobListResponse,
+    IngestionJobProgress,
+    IngestionJobRequest,
+    IngestionJobResponse,
+    IngestionListResponse,
+    IngestionRecord,
+    IngestionStats,
+)
+from .search import SearchResponse, SearchResult
+
+__all__ = [
+    "ChatBatchItem",
+    "ChatBatchRequest",
+    "ChatBatchResponse",
+    "IngestionJobListResponse",
+    "IngestionJobProgress",
+    "IngestionJobRequest",
+    "IngestionJobResponse",
+    "IngestionListResponse",
+    "IngestionRecord",
+    "IngestionStats",
+    "SearchResponse",
+    "SearchResult",
+]
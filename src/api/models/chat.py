@@ -0,0 +1,27 @@
+"""Pydantic schemas for the chat endpoints."""
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class ChatBatchRequest(BaseModel):
+    """Request body for answering many queries in one call."""
+
+    queries: List[str] = Field(..., min_length=1, max_length=100, description="The user query strings")
+    only_latest: bool = Field(False, description="Whether to return only the latest results")
+    debug: bool = Field(False, description="Whether to return debug information")
+
+
+class ChatBatchItem(BaseModel):
+    """Result of a single query of a batch. Exactly one of result and error is set."""
+
+    index: int
+    query: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class ChatBatchResponse(BaseModel):
+    """Batch results, in the same order as the submitted queries."""
+
+    results: List[ChatBatchItem]
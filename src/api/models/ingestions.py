@@ -0,0 +1,56 @@
+"""Pydantic schemas for the ingestion endpoints."""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class IngestionStats(BaseModel):
+    """Aggregates over the chunks currently stored for an ingestion."""
+
+    file_count: int
+    chunk_count: int
+    total_characters: int
+
+
+class IngestionRecord(BaseModel):
+    ingestion_id: str
+    timestamp: str
+    number_of_chunks: int
+    stats: Optional[IngestionStats] = None
+
+
+class IngestionListResponse(BaseModel):
+    """One page of ingestions. Pass next_cursor back as ``cursor`` for the next page."""
+
+    ingestions: List[IngestionRecord]
+    next_cursor: Optional[str] = None
+
+
+class IngestionJobRequest(BaseModel):
+    """Request body for starting a background ingestion."""
+
+    directory: str = Field(..., description="Directory of markdown files, relative to the ingestion root")
+
+
+class IngestionJobProgress(BaseModel):
+    ingestion_id: Optional[str] = None
+    files_total: int
+    files_processed: int
+    chunks_embedded: int
+    chunks_written: int
+    chunks_per_second: float
+    eta_seconds: Optional[float] = None
+
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    directory: str
+    status: str
+    created_at: str
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    progress: IngestionJobProgress
+
+
+class IngestionJobListResponse(BaseModel):
+    jobs: List[IngestionJobResponse]
@@ -0,0 +1,21 @@
+"""Pydantic schemas for the search endpoint."""
+
+from typing import Any, Dict, List
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    """A retrieved chunk and its cosine distance to the query (lower is closer)."""
+
+    source: str
+    chunk_index: int
+    content: str
+    distance: float
+    metadata: Dict[str, Any]
+
+
+class SearchResponse(BaseModel):
+    """Ranked chunks, nearest first."""
+
+    query: str
+    results: List[SearchResult]
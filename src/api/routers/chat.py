@@ -1,14 +1,21 @@
 """Chat endpoint router."""
 
+import os
 from src.ai.rag.orchestrator import RAGOrchestrator
+from src.ai.rag.utils.limits import StageOverloaded
+from src.api.models import ChatBatchRequest, ChatBatchResponse
 from src.utils.logger import getLogger
 from fastapi import APIRouter, Query
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
 logger = getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
+# Maximum number of batch queries generating/evaluating at the same time
+BATCH_MAX_CONCURRENCY = int(os.getenv("RAG_BATCH_MAX_CONCURRENCY", "4"))
+
 
 @router.get("/chat")
 async def chat(
@@ -20,8 +27,34 @@ async def chat(
     
     orchestrator = RAGOrchestrator()
     try:
-        result = orchestrator.run(query, only_latest, debug)
+        # Run off the event loop so concurrent requests overlap (and can be coalesced)
+        result = await run_in_threadpool(orchestrator.run, query, only_latest, debug)
         return result
+    except StageOverloaded as e:
+        logger.warning(f"Overloaded in chat endpoint: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """Batch chat endpoint answering many queries in one pipeline pass."""
+
+    orchestrator = RAGOrchestrator()
+    try:
+        results = await run_in_threadpool(
+            orchestrator.run_batch,
+            request.queries,
+            request.only_latest,
+            request.debug,
+            BATCH_MAX_CONCURRENCY
+        )
+        return {"results": results}
+    except StageOverloaded as e:
+        logger.warning(f"Overloaded in chat batch endpoint: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"Error in chat batch endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
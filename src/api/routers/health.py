@@ -1,12 +1,81 @@
 """Health check endpoint router."""
 
-from fastapi import APIRouter
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.ai.rag.embeddings import get_embedding_provider
+from src.db.connection import with_connection
+from src.utils.logger import getLogger
+
+logger = getLogger(__name__)
 
 router = APIRouter()
 
+READINESS_CACHE_SECONDS = float(os.getenv("RAG_READINESS_CACHE_SECONDS", "5"))
+
+_last_probe: Optional[Tuple[float, Dict[str, str]]] = None
+_probe_lock = threading.Lock()
+
+
+def _ping_database(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    connection.commit()
+
+
+def _probe() -> Dict[str, str]:
+    """Checks the database and the embedding backend, reusing a recent result."""
+
+    global _last_probe
+    with _probe_lock:
+        now = time.monotonic()
+        if _last_probe is not None and now - _last_probe[0] < READINESS_CACHE_SECONDS:
+            return _last_probe[1]
+
+        checks = {}
+        for name, check in (
+            ("database", lambda: with_connection(_ping_database)),
+            ("embeddings", lambda: get_embedding_provider().check()),
+        ):
+            try:
+                check()
+                checks[name] = "ok"
+            except Exception as e:
+                logger.warning(f"Readiness check {name} failed: {e}")
+                checks[name] = f"failed: {e}"
+
+        _last_probe = (now, checks)
+        return checks
+
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint to verify API is running."""
     return {"status": "healthy"}
 
+
+@router.get("/health/ready")
+async def readiness_check(request: Request):
+    """Readiness endpoint: 503 while shutting down or when the database or embedding backend is unreachable."""
+
+    if getattr(request.app.state, "draining", False):
+        return JSONResponse(status_code=503, content={"status": "draining"})
+
+    checks = await run_in_threadpool(_probe)
+    ready = all(result == "ok" for result in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "checks": checks,
+            # Outcome of the last real embedding call (warm-up or a request), reported but not gating
+            "last_embedding_call": get_embedding_provider().last_call or "none",
+        },
+    )
@@ -1,31 +1,106 @@
 """Ingestions endpoint router."""
 
-from fastapi import APIRouter
-from src.db.connection import conn
-from typing import List, Dict
+import base64
+import json
+import os
+import uuid
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from src.ai.rag.ingestion_jobs import ingestion_jobs
+from src.api.models import (
+    IngestionJobListResponse,
+    IngestionJobRequest,
+    IngestionJobResponse,
+    IngestionListResponse,
+)
+from src.db.connection import with_connection
+from src.db.ingestions import list_ingestions
+from typing import Optional, Tuple
 from datetime import datetime
 
 router = APIRouter(prefix="/api/v1", tags=["ingestions"])
 
+# Ingestion jobs may only read directories below this root
+INGESTION_ROOT = Path(os.getenv("RAG_INGESTION_ROOT", "data/raw_docs")).resolve()
 
-@router.get("/ingestions")
-async def get_ingestions() -> List[Dict]:
-    """Get all ingestion records with ingestion_id, timestamp, and number of chunks."""
-    
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "SELECT ingestion_id, ingested_at, chunks_processed FROM ingestion_metadata ORDER BY ingested_at DESC"
-        )
-        rows = cursor.fetchall()
-        
-        ingestions = []
-        for row in rows:
-            ingestion_id, ingested_at, chunks_processed = row
-            ingestions.append({
-                "ingestion_id": str(ingestion_id),
-                "timestamp": ingested_at.isoformat() if isinstance(ingested_at, datetime) else ingested_at,
-                "number_of_chunks": chunks_processed
-            })
-        
-        return ingestions
 
+@router.get("/ingestions", response_model=IngestionListResponse)
+async def get_ingestions(
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of ingestions to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    since: Optional[datetime] = Query(None, description="Only ingestions at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only ingestions before this time"),
+    min_chunks: Optional[int] = Query(None, ge=0, description="Only ingestions with at least this many chunks"),
+):
+    """Get one page of ingestion records, newest first, with per-ingestion chunk stats."""
+
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await run_in_threadpool(
+        with_connection, list_ingestions, limit, after, since, until, min_chunks
+    )
+
+    ingestions = [
+        {
+            "ingestion_id": row["ingestion_id"],
+            "timestamp": row["ingested_at"].isoformat() if isinstance(row["ingested_at"], datetime) else row["ingested_at"],
+            "number_of_chunks": row["chunks_processed"],
+            "stats": row["stats"],
+        }
+        for row in rows
+    ]
+    next_cursor = _encode_cursor(rows[-1]["ingested_at"], rows[-1]["ingestion_id"]) if len(rows) == limit else None
+
+    return {"ingestions": ingestions, "next_cursor": next_cursor}
+
+
+def _encode_cursor(ingested_at: datetime, ingestion_id: str) -> str:
+    payload = json.dumps({"ingested_at": ingested_at.isoformat(), "ingestion_id": ingestion_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["ingested_at"]), str(uuid.UUID(payload["ingestion_id"]))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.post("/ingestions", status_code=202, response_model=IngestionJobResponse)
+async def start_ingestion(request: IngestionJobRequest):
+    """Start a background ingestion of a directory below the ingestion root."""
+
+    directory = (INGESTION_ROOT / request.directory).resolve()
+    if not directory.is_relative_to(INGESTION_ROOT) or not directory.is_dir():
+        raise HTTPException(status_code=400, detail=f"Not a directory under the ingestion root: {request.directory}")
+
+    job = ingestion_jobs.submit(directory)
+    return job.to_dict()
+
+
+@router.get("/ingestions/jobs", response_model=IngestionJobListResponse)
+async def list_ingestion_jobs():
+    """List background ingestion jobs, newest first."""
+
+    return {"jobs": [job.to_dict() for job in ingestion_jobs.list_jobs()]}
+
+
+@router.get("/ingestions/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: uuid.UUID):
+    """Get the status and progress of a background ingestion job."""
+
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found on this worker")
+    return job.to_dict()
+
+
+@router.post("/ingestions/jobs/{job_id}/cancel", status_code=202, response_model=IngestionJobResponse)
+async def cancel_ingestion_job(job_id: uuid.UUID):
+    """Cancel a queued or running ingestion job. Chunks already written are removed."""
+
+    job = ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found on this worker")
+    return job.to_dict()
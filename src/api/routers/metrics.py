@@ -0,0 +1,14 @@
+"""Prometheus metrics endpoint router."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose process metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,48 @@
+"""Retrieval-only search endpoint router."""
+
+from src.ai.rag.orchestrator import search_chunks
+from src.ai.rag.retriever import Retriever
+from src.ai.rag.utils.limits import StageOverloaded
+from src.api.models import SearchResponse
+from src.utils.logger import getLogger
+from fastapi import APIRouter, Query
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+logger = getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["search"])
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    query: str = Query(..., description="The user query string"),
+    top_k: int = Query(5, ge=1, le=50, description="Maximum number of chunks to return"),
+    only_latest: bool = Query(False, description="Whether to search only the latest ingestion")
+):
+    """Search endpoint returning the ranked chunks for a query, without generating an answer."""
+
+    # A retriever only: this endpoint must not depend on the LLM clients
+    retriever = Retriever()
+    try:
+        chunks = await run_in_threadpool(search_chunks, retriever, query, only_latest, top_k)
+    except StageOverloaded as e:
+        logger.warning(f"Overloaded in search endpoint: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"Error in search endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "query": query,
+        "results": [
+            {
+                "source": chunk.chunk.source,
+                "chunk_index": chunk.chunk.metadata["chunk_index"],
+                "content": chunk.chunk.content,
+                "distance": chunk.distance,
+                "metadata": chunk.chunk.metadata,
+            }
+            for chunk in chunks
+        ],
+    }
@@ -1,12 +1,177 @@
+"""
+Database connections.
+
+Nothing connects at import. Short-lived work borrows a connection from the
+per-process pool returned by ``get_pool``; long-running work (ingestion,
+retention) opens its own with ``connect``. The pool is created lazily and
+forgotten in forked children, so every worker process opens its own
+connections after it starts.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
 import psycopg
-from pgvector.psycopg import register_vector
-
-conn = psycopg.connect(
-    dbname="rag",
-    user="psykick",          # usually your mac username
-    password=None,           # empty for local Homebrew installs
-    host="localhost",
-    port=5432,
+from psycopg import pq
+
+from src.utils.logger import getLogger
+from src.utils.metrics import REGISTRY
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+POOL_CONNECTIONS = REGISTRY.gauge(
+    "rag_db_pool_connections",
+    "Open connections of the database pool",
+    ("state",),
 )
 
-register_vector(conn)
\ No newline at end of file
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became available in time."""
+
+
+def connect() -> psycopg.Connection:
+    """Opens a new connection to the RAG database with pgvector types registered."""
+
+    # Imported here so that processes which never touch the database do not load it
+    from pgvector.psycopg import register_vector
+
+    connection = psycopg.connect(
+        dbname=os.getenv("RAG_DB_NAME", "rag"),
+        user=os.getenv("RAG_DB_USER", "psykick"),  # usually your mac username
+        password=os.getenv("RAG_DB_PASSWORD"),     # empty for local Homebrew installs
+        host=os.getenv("RAG_DB_HOST", "localhost"),
+        port=int(os.getenv("RAG_DB_PORT", "5432")),
+    )
+    register_vector(connection)
+    return connection
+
+
+class ConnectionPool:
+    """
+    A small, process-local pool of connections.
+
+    Connections are opened on demand up to ``max_size`` and reused; a
+    borrower waits at most ``timeout`` seconds for one to be returned.
+    Connections left in a transaction are rolled back on return and broken
+    ones are discarded.
+    """
+
+    def __init__(self, max_size: int = 8, timeout: float = 10.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle: List[psycopg.Connection] = []
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg.Connection]:
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            for connection in self.idle:
+                connection.close()
+            self.size -= len(self.idle)
+            self.idle.clear()
+            self._update_metrics()
+            self.condition.notify_all()
+
+    def _acquire(self) -> psycopg.Connection:
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: self.closed or self.idle or self.size < self.max_size,
+                timeout=self.timeout,
+            ):
+                raise PoolTimeout(f"No database connection available within {self.timeout}s")
+            if self.closed:
+                raise PoolTimeout("The database pool is closed")
+            if self.idle:
+                connection = self.idle.pop()
+                self._update_metrics()
+                return connection
+            self.size += 1
+
+        # Connect outside the lock so other borrowers are not held up
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self._update_metrics()
+        return connection
+
+    def _release(self, connection: psycopg.Connection) -> None:
+        if not connection.closed and connection.info.transaction_status != pq.TransactionStatus.IDLE:
+            try:
+                connection.rollback()
+            except psycopg.Error:
+                connection.close()
+
+        with self.condition:
+            if connection.closed or connection.broken or self.closed:
+                connection.close()
+                self.size -= 1
+            else:
+                self.idle.append(connection)
+            self._update_metrics()
+            self.condition.notify()
+
+    def _update_metrics(self) -> None:
+        POOL_CONNECTIONS.set(len(self.idle), state="idle")
+        POOL_CONNECTIONS.set(self.size - len(self.idle), state="in_use")
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns this process's connection pool, creating it on first use."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                max_size=int(os.getenv("RAG_DB_POOL_SIZE", "8")),
+                timeout=float(os.getenv("RAG_DB_POOL_TIMEOUT", "10")),
+            )
+        return _pool
+
+
+def with_connection(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Calls ``fn(connection, *args, **kwargs)`` with a connection borrowed from the pool."""
+
+    with get_pool().connection() as connection:
+        return fn(connection, *args, **kwargs)
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _forget_pool_after_fork() -> None:
+    # The parent's sockets must not be used, nor closed, by a child
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pool_after_fork)
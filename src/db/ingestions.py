@@ -0,0 +1,117 @@
+"""Queries over the ingestion history."""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg import Connection
+
+_STATS_COLUMNS = ("file_count", "chunk_count", "total_characters")
+
+
+def list_ingestions(
+    connection: Connection,
+    limit: int,
+    after: Optional[Tuple[datetime, str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_chunks: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Returns one page of ingestions, newest first.
+
+    Pages are keyset-paginated on (ingested_at, ingestion_id): ``after`` is
+    the key of the last row of the previous page.
+    """
+
+    conditions = []
+    params: List[Any] = []
+    if after is not None:
+        after_ingested_at, after_ingestion_id = after
+        # Row comparison in the index's own (ingested_at, ingestion_id) order, so the index serves it
+        conditions.append("(ingested_at, ingestion_id) < (%s, %s::uuid)")
+        params.extend([after_ingested_at, after_ingestion_id])
+    if since is not None:
+        conditions.append("ingested_at >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("ingested_at < %s")
+        params.append(until)
+    if min_chunks is not None:
+        conditions.append("chunks_processed >= %s")
+        params.append(min_chunks)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT ingestion_id::text, ingested_at, chunks_processed
+            FROM ingestion_metadata
+            {where_clause}
+            ORDER BY ingested_at DESC, ingestion_id DESC
+            LIMIT %s
+            """,
+            (*params, limit)
+        )
+        rows = cursor.fetchall()
+    connection.commit()
+
+    stats = get_ingestion_stats(connection, [row[0] for row in rows])
+
+    return [
+        {
+            "ingestion_id": ingestion_id,
+            "ingested_at": ingested_at,
+            "chunks_processed": chunks_processed,
+            "stats": stats.get(ingestion_id),
+        }
+        for ingestion_id, ingested_at, chunks_processed in rows
+    ]
+
+
+def get_ingestion_stats(connection: Connection, ingestion_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Returns file/chunk/character counts per ingestion.
+
+    Counts are read from ingestion_stats; ingestions not summarized yet are
+    aggregated from file_chunks once and stored, so later calls never
+    rescan their chunks.
+    """
+
+    if not ingestion_ids:
+        return {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO ingestion_stats (ingestion_id, file_count, chunk_count, total_characters)
+            SELECT ids.ingestion_id,
+                   COUNT(DISTINCT fc.file_name),
+                   COUNT(fc.file_name),
+                   COALESCE(SUM(length(fc.content)), 0)
+            FROM unnest(%s::text[]) AS ids(ingestion_id)
+            LEFT JOIN file_chunks fc ON fc.metadata->>'ingestion_id' = ids.ingestion_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM ingestion_stats s WHERE s.ingestion_id = ids.ingestion_id
+            )
+            GROUP BY ids.ingestion_id
+            ON CONFLICT (ingestion_id) DO NOTHING
+            """,
+            (ingestion_ids,)
+        )
+        cursor.execute(
+            f"SELECT ingestion_id, {', '.join(_STATS_COLUMNS)} FROM ingestion_stats WHERE ingestion_id = ANY(%s)",
+            (ingestion_ids,)
+        )
+        rows = cursor.fetchall()
+    connection.commit()
+
+    return {row[0]: dict(zip(_STATS_COLUMNS, row[1:])) for row in rows}
+
+
+def invalidate_ingestion_stats(connection: Connection, ingestion_ids: List[str]) -> None:
+    """Drops stored stats so they are recomputed on the next listing."""
+
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM ingestion_stats WHERE ingestion_id = ANY(%s)", (ingestion_ids,))
+    connection.commit()
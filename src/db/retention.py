@@ -0,0 +1,317 @@
+"""
+Retention of superseded ingestions in file_chunks.
+
+Every ingestion appends a full copy of the corpus, so older ingestions are
+deleted according to a keep-last-N / keep-since policy. Deletes run in
+small batches so they never hold long locks, then VACUUM and REINDEX
+return the space to the table and its indexes. Runs that delete hold a
+session advisory lock, so only one worker or CLI run applies a policy
+at a time.
+
+Usage:
+    python -m src.db.retention --keep-last 3 --dry-run
+    python -m src.db.retention --keep-last 3 --keep-days 30
+"""
+
+import argparse
+import asyncio
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from psycopg import Connection
+from starlette.concurrency import run_in_threadpool
+
+from src.ai.rag.llm_cache import get_llm_cache
+from src.db.connection import connect
+from src.db.ingestions import invalidate_ingestion_stats
+from src.utils.logger import getLogger
+
+logger = getLogger(__name__)
+
+# pg_try_advisory_lock key held by the run that is deleting; any constant unique to this application
+RETENTION_LOCK_KEY = 0x7261675F726574
+
+
+@dataclass(slots=True)
+class RetentionPolicy:
+    """
+    An ingestion is kept if it is one of the ``keep_last`` newest or was
+    ingested at or after ``keep_since``. The newest ingestion is always kept.
+    """
+    keep_last: Optional[int] = None
+    keep_since: Optional[datetime] = None
+
+    def __post_init__(self):
+        if self.keep_last is None and self.keep_since is None:
+            raise ValueError("A retention policy needs keep_last, keep_since or both")
+        if self.keep_last is not None and self.keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+
+
+@dataclass(slots=True)
+class SupersededIngestion:
+    ingestion_id: str
+    ingested_at: datetime
+    chunk_count: int
+    estimated_bytes: int
+
+
+@dataclass(slots=True)
+class RetentionPlan:
+    ingestions: List[SupersededIngestion] = field(default_factory=list)
+    table_bytes: int = 0
+    # Size of file_chunks and its indexes once the plan has been applied
+    table_bytes_after: Optional[int] = None
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(ingestion.chunk_count for ingestion in self.ingestions)
+
+    @property
+    def estimated_bytes(self) -> int:
+        return sum(ingestion.estimated_bytes for ingestion in self.ingestions)
+
+
+def plan_retention(connection: Connection, policy: RetentionPolicy) -> RetentionPlan:
+    """Lists the ingestions the policy would delete and the space they take."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT ingestion_id::text, ingested_at
+            FROM ingestion_metadata
+            ORDER BY ingested_at DESC, ingestion_id DESC
+            """
+        )
+        ingestions = cursor.fetchall()
+
+        superseded = [
+            (ingestion_id, ingested_at)
+            for rank, (ingestion_id, ingested_at) in enumerate(ingestions)
+            if rank > 0
+            and (policy.keep_last is None or rank >= policy.keep_last)
+            and (policy.keep_since is None or ingested_at < policy.keep_since)
+        ]
+
+        # Row sizes as stored (after TOAST compression); index space is not included
+        sizes = {}
+        if superseded:
+            cursor.execute(
+                """
+                SELECT metadata->>'ingestion_id', COUNT(*), COALESCE(SUM(pg_column_size(fc.*)), 0)
+                FROM file_chunks fc
+                WHERE metadata->>'ingestion_id' = ANY(%s)
+                GROUP BY 1
+                """,
+                ([ingestion_id for ingestion_id, _ in superseded],)
+            )
+            sizes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    connection.commit()
+    table_bytes = _table_bytes(connection)
+
+    return RetentionPlan(
+        ingestions=[
+            SupersededIngestion(ingestion_id, ingested_at, *sizes.get(ingestion_id, (0, 0)))
+            for ingestion_id, ingested_at in superseded
+        ],
+        table_bytes=table_bytes,
+    )
+
+
+def apply_retention(connection: Connection, plan: RetentionPlan, batch_size: int = 5000) -> int:
+    """
+    Deletes the chunks and metadata of every ingestion in the plan.
+
+    Chunks are deleted ``batch_size`` rows per transaction. The metadata
+    row goes last, so an interrupted run is simply picked up again by the
+    next one. Cached LLM responses built from the ingestion are dropped.
+    Returns the number of chunks deleted.
+    """
+
+    deleted = 0
+    for ingestion in plan.ingestions:
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    DELETE FROM file_chunks
+                    WHERE ctid = ANY(ARRAY(
+                        SELECT ctid FROM file_chunks
+                        WHERE metadata->>'ingestion_id' = %s
+                        LIMIT %s
+                    ))
+                    """,
+                    (ingestion.ingestion_id, batch_size)
+                )
+                batch_deleted = cursor.rowcount
+            connection.commit()
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                break
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM ingestion_metadata WHERE ingestion_id::text = %s",
+                (ingestion.ingestion_id,)
+            )
+        connection.commit()
+        invalidate_ingestion_stats(connection, [ingestion.ingestion_id])
+        get_llm_cache().invalidate_ingestions([ingestion.ingestion_id])
+        logger.info(f"Deleted ingestion {ingestion.ingestion_id} ({ingestion.chunk_count} chunks)")
+
+    return deleted
+
+
+def compact_file_chunks(connection: Connection) -> None:
+    """Runs VACUUM and REINDEX on file_chunks so freed space can be reused."""
+
+    # VACUUM and REINDEX CONCURRENTLY cannot run inside a transaction block
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM (ANALYZE) file_chunks")
+            cursor.execute("REINDEX TABLE CONCURRENTLY file_chunks")
+    finally:
+        connection.autocommit = autocommit
+
+
+def run_retention(
+    policy: RetentionPolicy,
+    dry_run: bool = False,
+    batch_size: int = 5000,
+    compact: bool = True,
+) -> Optional[RetentionPlan]:
+    """
+    Plans and, unless ``dry_run``, applies the policy on a dedicated connection.
+
+    Returns None without touching the table when another run holds the
+    retention lock.
+    """
+
+    connection = connect()
+    try:
+        if not dry_run and not _try_lock(connection):
+            logger.info("Retention: skipped, another run holds the retention lock")
+            return None
+        plan = plan_retention(connection, policy)
+        logger.info(
+            f"Retention: {len(plan.ingestions)} superseded ingestions, {plan.chunk_count} chunks, "
+            f"~{_format_bytes(plan.estimated_bytes)} of {_format_bytes(plan.table_bytes)}"
+        )
+        if dry_run or not plan.ingestions:
+            return plan
+
+        apply_retention(connection, plan, batch_size)
+        if compact:
+            compact_file_chunks(connection)
+        plan.table_bytes_after = _table_bytes(connection)
+        return plan
+    finally:
+        # Closing the session releases the advisory lock
+        connection.close()
+
+
+def retention_policy_from_env() -> Optional[RetentionPolicy]:
+    """
+    Builds the scheduled policy from RAG_RETENTION_KEEP_LAST and
+    RAG_RETENTION_KEEP_DAYS. Returns None when neither is set.
+    """
+
+    keep_last = os.getenv("RAG_RETENTION_KEEP_LAST")
+    keep_days = os.getenv("RAG_RETENTION_KEEP_DAYS")
+    if not keep_last and not keep_days:
+        return None
+    return RetentionPolicy(
+        keep_last=int(keep_last) if keep_last else None,
+        keep_since=datetime.now() - timedelta(days=float(keep_days)) if keep_days else None,
+    )
+
+
+async def run_retention_periodically(interval_seconds: float) -> None:
+    """Applies the environment policy every ``interval_seconds`` until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        # Re-read so keep_days stays relative to the time of each run
+        policy = retention_policy_from_env()
+        if policy is None:
+            continue
+        try:
+            await run_in_threadpool(run_retention, policy)
+        except Exception as e:
+            logger.error(f"Scheduled retention failed: {e}")
+
+
+def _try_lock(connection: Connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (RETENTION_LOCK_KEY,))
+        locked = cursor.fetchone()[0]
+    connection.commit()
+    return locked
+
+
+def _table_bytes(connection: Connection) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_total_relation_size('file_chunks')")
+        table_bytes = cursor.fetchone()[0]
+    connection.commit()
+    return table_bytes
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete superseded ingestions from file_chunks")
+    parser.add_argument("--keep-last", type=int, help="Keep the N newest ingestions")
+    parser.add_argument("--keep-since", type=datetime.fromisoformat, help="Keep ingestions at or after this ISO date")
+    parser.add_argument("--keep-days", type=float, help="Keep ingestions from the last N days")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Chunks deleted per transaction")
+    parser.add_argument("--no-compact", action="store_true", help="Skip VACUUM and REINDEX")
+    args = parser.parse_args()
+
+    keep_since = args.keep_since
+    if args.keep_days is not None:
+        days_cutoff = datetime.now() - timedelta(days=args.keep_days)
+        keep_since = min(keep_since, days_cutoff) if keep_since else days_cutoff
+
+    try:
+        policy = RetentionPolicy(keep_last=args.keep_last, keep_since=keep_since)
+    except ValueError as e:
+        parser.error(str(e))
+
+    plan = run_retention(policy, dry_run=args.dry_run, batch_size=args.batch_size, compact=not args.no_compact)
+    if plan is None:
+        raise SystemExit("Another retention run is in progress; nothing was deleted")
+
+    for ingestion in plan.ingestions:
+        print(
+            f"{ingestion.ingestion_id}  {ingestion.ingested_at.isoformat()}  "
+            f"{ingestion.chunk_count:>8} chunks  {_format_bytes(ingestion.estimated_bytes):>10}"
+        )
+    # Plain VACUUM only makes the deleted rows' space reusable; the table file itself does not shrink
+    action = "Would delete" if args.dry_run else "Deleted"
+    print(
+        f"{action} ~{_format_bytes(plan.estimated_bytes)} of rows ({plan.chunk_count} chunks from "
+        f"{len(plan.ingestions)} ingestions), freed for reuse by file_chunks"
+    )
+    if plan.table_bytes_after is None:
+        print(f"file_chunks and its indexes take {_format_bytes(plan.table_bytes)}")
+    else:
+        print(
+            f"file_chunks and its indexes: {_format_bytes(plan.table_bytes)} before, "
+            f"{_format_bytes(plan.table_bytes_after)} after"
+        )
+
+
+if __name__ == "__main__":
+    main()
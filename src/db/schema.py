@@ -0,0 +1,124 @@
+"""
+Indexes and derived tables the application relies on.
+
+The base tables (file_chunks, ingestion_metadata) are created outside the
+application; everything here is idempotent. It is applied once before the
+API workers start (see src.api.app.run_app) under an advisory lock, so
+concurrent runs wait for each other instead of racing on the catalog.
+
+Usage:
+    python -m src.db.schema
+"""
+
+from psycopg import Connection, Cursor
+
+# pg_advisory_lock key held while the schema is applied; any constant unique to this application
+SCHEMA_LOCK_KEY = 0x7261675F736368
+
+SCHEMA_STATEMENTS = [
+    # Keyset pagination of the ingestion history, newest first
+    """
+    CREATE INDEX IF NOT EXISTS ingestion_metadata_ingested_at_idx
+    ON ingestion_metadata (ingested_at DESC, ingestion_id DESC)
+    """,
+    # Per-ingestion lookups of chunks (only_latest search, stats, deletes); built
+    # concurrently so ingestions can keep writing to file_chunks meanwhile
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS file_chunks_ingestion_id_idx
+    ON file_chunks ((metadata->>'ingestion_id'))
+    """,
+    # Aggregates of file_chunks per ingestion, computed once and reused
+    """
+    CREATE TABLE IF NOT EXISTS ingestion_stats (
+        ingestion_id text PRIMARY KEY,
+        file_count integer NOT NULL,
+        chunk_count integer NOT NULL,
+        total_characters bigint NOT NULL,
+        computed_at timestamp NOT NULL DEFAULT now()
+    )
+    """,
+    # Shared LLM response cache (RAG_LLM_CACHE=postgres)
+    """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        key text PRIMARY KEY,
+        payload text NOT NULL,
+        ingestion_ids text[] NOT NULL,
+        expires_at timestamptz NOT NULL,
+        input_tokens integer NOT NULL,
+        output_tokens integer NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS llm_response_cache_ingestion_ids_idx
+    ON llm_response_cache USING gin (ingestion_ids)
+    """,
+    # Purging expired and excess entries
+    """
+    CREATE INDEX IF NOT EXISTS llm_response_cache_expires_at_idx
+    ON llm_response_cache (expires_at)
+    """,
+]
+
+
+# Columns added to existing tables, only altered when missing: ALTER TABLE
+# takes an ACCESS EXCLUSIVE lock even when the column already exists
+SCHEMA_COLUMNS = [
+    # Embedding model each ingestion was built with, checked at retrieval time
+    ("ingestion_metadata", "embedding_model", "text"),
+    ("ingestion_metadata", "embedding_dimension", "integer"),
+]
+
+
+def apply_schema(connection: Connection) -> None:
+    """
+    Creates the columns, indexes and tables above if they do not exist.
+
+    Statements run in autocommit mode, as CREATE INDEX CONCURRENTLY requires,
+    while holding a session advisory lock.
+    """
+
+    connection.commit()
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (SCHEMA_LOCK_KEY,))
+            try:
+                for table, column, column_type in SCHEMA_COLUMNS:
+                    if not _column_exists(cursor, table, column):
+                        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+                # A concurrent build that was interrupted leaves an invalid index IF NOT EXISTS would keep
+                _drop_invalid_index(cursor, "file_chunks_ingestion_id_idx")
+                for statement in SCHEMA_STATEMENTS:
+                    cursor.execute(statement)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (SCHEMA_LOCK_KEY,))
+    finally:
+        connection.autocommit = autocommit
+
+
+def _column_exists(cursor: Cursor, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+        (table, column),
+    )
+    return cursor.fetchone() is not None
+
+
+def _drop_invalid_index(cursor: Cursor, name: str) -> None:
+    cursor.execute(
+        "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid",
+        (name,),
+    )
+    if cursor.fetchone() is not None:
+        cursor.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+if __name__ == "__main__":
+    from src.db.connection import connect
+
+    connection = connect()
+    try:
+        apply_schema(connection)
+    finally:
+        connection.close()
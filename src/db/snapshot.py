@@ -0,0 +1,381 @@
+"""
+Snapshots of an ingestion's chunks, metadata and embeddings.
+
+A snapshot is a directory of column files, readable without the database:
+
+- ``embeddings.npy``: float32 matrix, one row per chunk
+- ``chunk_index.npy``: int64 vector
+- ``<column>.bin`` + ``<column>_offsets.npy`` for the ``file_name``,
+  ``content`` and ``metadata`` (JSON text) columns: the UTF-8 values
+  concatenated, and the int64 start offset of each row followed by the end
+  of the last one
+- ``manifest.json``: the ingestion_metadata row, row count, dimension and
+  the size and SHA-256 of every column file
+
+Every column file is memory-mapped on read, so restoring an ingestion does
+not hold it in memory. Export and import both stream through binary COPY,
+which skips the textual vector format; no embedding is recomputed.
+
+Usage:
+    python -m src.db.snapshot export <ingestion_id> snapshots/<name>
+    python -m src.db.snapshot verify snapshots/<name>
+    python -m src.db.snapshot import snapshots/<name>
+"""
+
+import argparse
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+from psycopg import Connection
+from psycopg.types.json import set_json_dumps
+
+from src.db.connection import connect
+from src.utils.logger import getLogger
+
+logger = getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+STRING_COLUMNS = ("file_name", "content", "metadata")
+COPY_COLUMNS = ("file_name", "chunk_index", "content", "embedding", "metadata")
+
+# A file_chunks row as stored in a snapshot: file_name, chunk_index, content, embedding, metadata JSON
+SnapshotRow = Tuple[str, int, str, np.ndarray, str]
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is incomplete, corrupted or cannot be restored."""
+
+
+@dataclass(slots=True)
+class SnapshotManifest:
+    ingestion_id: str
+    ingested_at: str
+    chunks_processed: int
+    embedding_model: Optional[str]
+    embedding_dimension: int
+    row_count: int
+    files: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    format_version: int = FORMAT_VERSION
+
+    @classmethod
+    def read(cls, directory: Path) -> "SnapshotManifest":
+        path = directory / MANIFEST_FILE
+        if not path.exists():
+            raise SnapshotError(f"No {MANIFEST_FILE} in {directory}")
+        manifest = cls(**json.loads(path.read_text()))
+        if manifest.format_version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format version {manifest.format_version}")
+        return manifest
+
+    def write(self, directory: Path) -> None:
+        (directory / MANIFEST_FILE).write_text(json.dumps(asdict(self), indent=2))
+
+
+class _StringColumnWriter:
+    """Appends UTF-8 values to ``<name>.bin`` and records their offsets."""
+
+    def __init__(self, directory: Path, name: str, row_count: int):
+        self.name = name
+        self.file = open(directory / f"{name}.bin", "wb")
+        self.offsets = np.lib.format.open_memmap(
+            directory / f"{name}_offsets.npy", mode="w+", dtype=np.int64, shape=(row_count + 1,)
+        )
+        self.offsets[0] = 0
+        self.position = 0
+
+    def write(self, row: int, value: str) -> None:
+        data = value.encode("utf-8")
+        self.file.write(data)
+        self.position += len(data)
+        self.offsets[row + 1] = self.position
+
+    def close(self) -> None:
+        self.file.close()
+        self.offsets.flush()
+        del self.offsets
+
+
+class SnapshotWriter:
+    """
+    Writes ``row_count`` rows, in order, into a new snapshot directory.
+
+    The row count and dimension are fixed up front so that every column is
+    preallocated and written in place; ``close`` checks that exactly that
+    many rows were written, then records the checksums in the manifest.
+    """
+
+    def __init__(self, directory: Path, manifest: SnapshotManifest):
+        directory.mkdir(parents=True, exist_ok=True)
+        if (directory / MANIFEST_FILE).exists():
+            raise SnapshotError(f"{directory} already contains a snapshot")
+
+        self.directory = directory
+        self.manifest = manifest
+        self.rows_written = 0
+        shape = (manifest.row_count, manifest.embedding_dimension)
+        self.embeddings = np.lib.format.open_memmap(directory / "embeddings.npy", mode="w+", dtype=np.float32, shape=shape)
+        self.chunk_index = np.lib.format.open_memmap(
+            directory / "chunk_index.npy", mode="w+", dtype=np.int64, shape=(manifest.row_count,)
+        )
+        self.strings = {name: _StringColumnWriter(directory, name, manifest.row_count) for name in STRING_COLUMNS}
+
+    def write_row(self, row: SnapshotRow) -> None:
+        i = self.rows_written
+        if i >= self.manifest.row_count:
+            raise SnapshotError(f"More rows than the {self.manifest.row_count} announced")
+
+        file_name, chunk_index, content, embedding, metadata = row
+        self.strings["file_name"].write(i, file_name)
+        self.chunk_index[i] = chunk_index
+        self.strings["content"].write(i, content)
+        self.embeddings[i] = embedding
+        self.strings["metadata"].write(i, metadata)
+        self.rows_written += 1
+
+    def close(self) -> SnapshotManifest:
+        self.embeddings.flush()
+        self.chunk_index.flush()
+        del self.embeddings, self.chunk_index
+        for column in self.strings.values():
+            column.close()
+
+        if self.rows_written != self.manifest.row_count:
+            raise SnapshotError(f"Wrote {self.rows_written} rows, expected {self.manifest.row_count}")
+
+        self.manifest.files = {
+            path.name: {"bytes": path.stat().st_size, "sha256": _sha256(path)}
+            for path in sorted(self.directory.iterdir())
+            if path.name != MANIFEST_FILE
+        }
+        # Written last: a directory without a manifest is an incomplete export
+        self.manifest.write(self.directory)
+        return self.manifest
+
+
+class Snapshot:
+    """Memory-mapped, read-only view of a snapshot directory."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.manifest = SnapshotManifest.read(directory)
+        self.embeddings = np.load(directory / "embeddings.npy", mmap_mode="r")
+        self.chunk_index = np.load(directory / "chunk_index.npy", mmap_mode="r")
+        self.strings = {name: self._load_string_column(name) for name in STRING_COLUMNS}
+
+        if self.embeddings.shape != (self.manifest.row_count, self.manifest.embedding_dimension):
+            raise SnapshotError(f"embeddings.npy has shape {self.embeddings.shape}, expected "
+                                f"({self.manifest.row_count}, {self.manifest.embedding_dimension})")
+
+    def __len__(self) -> int:
+        return self.manifest.row_count
+
+    def rows(self, batch_size: int = 10000) -> Iterator[SnapshotRow]:
+        """Yields every row in order, decoding ``batch_size`` rows' offsets and indexes at a time."""
+
+        def values(name: str, start: int, stop: int) -> Iterator[str]:
+            data, offsets = self.strings[name]
+            bounds = offsets[start:stop + 1].tolist()
+            for begin, end in zip(bounds, bounds[1:]):
+                yield bytes(data[begin:end]).decode("utf-8")
+
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield from zip(
+                values("file_name", start, stop),
+                self.chunk_index[start:stop].tolist(),
+                values("content", start, stop),
+                self.embeddings[start:stop],
+                values("metadata", start, stop),
+            )
+
+    def _load_string_column(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        path = self.directory / f"{name}.bin"
+        # np.memmap cannot map an empty file
+        data = np.memmap(path, dtype=np.uint8, mode="r") if path.stat().st_size else np.empty(0, dtype=np.uint8)
+        offsets = np.load(self.directory / f"{name}_offsets.npy", mmap_mode="r")
+        if len(offsets) != self.manifest.row_count + 1 or offsets[-1] != len(data):
+            raise SnapshotError(f"{name}_offsets.npy does not match {name}.bin")
+        return data, offsets
+
+
+def verify_snapshot(directory: Path) -> SnapshotManifest:
+    """Checks that every file listed in the manifest is present, of the right size and checksum."""
+
+    manifest = SnapshotManifest.read(directory)
+    for name, expected in manifest.files.items():
+        path = directory / name
+        if not path.exists():
+            raise SnapshotError(f"Missing {name}")
+        if path.stat().st_size != expected["bytes"]:
+            raise SnapshotError(f"{name} is {path.stat().st_size} bytes, expected {expected['bytes']}")
+        if _sha256(path) != expected["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for {name}")
+    return manifest
+
+
+def export_snapshot(connection: Connection, ingestion_id: str, directory: Path) -> SnapshotManifest:
+    """Writes the chunks and metadata of an ingestion to a new snapshot directory."""
+
+    with connection.cursor() as cursor:
+        # The row count and the copied rows must come from the same snapshot of the table
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute(
+            """
+            SELECT ingestion_id::text, ingested_at, chunks_processed, embedding_model, embedding_dimension
+            FROM ingestion_metadata
+            WHERE ingestion_id::text = %s
+            """,
+            (ingestion_id,)
+        )
+        ingestion = cursor.fetchone()
+        if ingestion is None:
+            connection.rollback()
+            raise SnapshotError(f"Unknown ingestion {ingestion_id}")
+
+        cursor.execute(
+            "SELECT COUNT(*), MAX(vector_dims(embedding)) FROM file_chunks WHERE metadata->>'ingestion_id' = %s",
+            (ingestion_id,)
+        )
+        row_count, dimension = cursor.fetchone()
+
+        writer = SnapshotWriter(directory, SnapshotManifest(
+            ingestion_id=ingestion[0],
+            ingested_at=ingestion[1].isoformat(),
+            chunks_processed=ingestion[2],
+            embedding_model=ingestion[3],
+            embedding_dimension=dimension or ingestion[4] or 0,
+            row_count=row_count,
+        ))
+        # Unordered: import does not depend on row order, and sorting rows with their
+        # embeddings would spill the whole ingestion to temporary files
+        with cursor.copy(
+            """
+            COPY (
+                SELECT file_name::text, chunk_index::int8, content::text, embedding, metadata::text
+                FROM file_chunks
+                WHERE metadata->>'ingestion_id' = %s
+            ) TO STDOUT (FORMAT BINARY)
+            """,
+            (ingestion_id,)
+        ) as copy:
+            copy.set_types(["text", "int8", "text", "vector", "text"])
+            for row in copy.rows():
+                writer.write_row(row)
+    connection.commit()
+
+    manifest = writer.close()
+    logger.info(f"Exported ingestion {ingestion_id} ({manifest.row_count} chunks) to {directory}")
+    return manifest
+
+
+def import_snapshot(connection: Connection, directory: Path, verify: bool = True) -> SnapshotManifest:
+    """
+    Restores a snapshot as a new ingestion, in a single transaction.
+
+    Fails if the ingestion already exists. The chunks are streamed with
+    binary COPY, typed after the file_chunks columns of this database, and
+    the ingestion_metadata row is inserted last.
+    """
+
+    manifest = verify_snapshot(directory) if verify else SnapshotManifest.read(directory)
+    snapshot = Snapshot(directory)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM ingestion_metadata WHERE ingestion_id::text = %s",
+            (manifest.ingestion_id,)
+        )
+        if cursor.fetchone() is not None:
+            connection.rollback()
+            raise SnapshotError(f"Ingestion {manifest.ingestion_id} already exists")
+
+        # Binary COPY applies no casts, so every value must be sent as the column's own type
+        cursor.execute(
+            """
+            SELECT a.attname, t.typname
+            FROM pg_attribute a
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE a.attrelid = 'file_chunks'::regclass AND a.attname = ANY(%s)
+            """,
+            (list(COPY_COLUMNS),)
+        )
+        column_types = dict(cursor.fetchall())
+        # Metadata is already JSON text; send it as is rather than re-encoding it as a string
+        set_json_dumps(lambda value: value, context=cursor)
+
+        with cursor.copy(
+            f"COPY file_chunks ({', '.join(COPY_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+        ) as copy:
+            copy.set_types([column_types[column] for column in COPY_COLUMNS])
+            for written, row in enumerate(snapshot.rows(), start=1):
+                copy.write_row(row)
+                if written % 100000 == 0:
+                    logger.info(f"Restored {written}/{len(snapshot)} chunks")
+
+        cursor.execute(
+            "INSERT INTO ingestion_metadata (ingestion_id, ingested_at, chunks_processed, embedding_model, embedding_dimension) VALUES (%s, %s, %s, %s, %s)",
+            (
+                manifest.ingestion_id,
+                datetime.fromisoformat(manifest.ingested_at),
+                manifest.chunks_processed,
+                manifest.embedding_model,
+                manifest.embedding_dimension,
+            )
+        )
+    connection.commit()
+
+    logger.info(f"Imported ingestion {manifest.ingestion_id} ({manifest.row_count} chunks) from {directory}")
+    return manifest
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and import ingestion snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write an ingestion to a snapshot directory")
+    export_parser.add_argument("ingestion_id")
+    export_parser.add_argument("directory", type=Path)
+    import_parser = commands.add_parser("import", help="Restore a snapshot as a new ingestion")
+    import_parser.add_argument("directory", type=Path)
+    import_parser.add_argument("--no-verify", action="store_true", help="Skip the checksum verification")
+    verify_parser = commands.add_parser("verify", help="Check a snapshot's files against its manifest")
+    verify_parser.add_argument("directory", type=Path)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "verify":
+            manifest = verify_snapshot(args.directory)
+        else:
+            connection = connect()
+            try:
+                if args.command == "export":
+                    manifest = export_snapshot(connection, args.ingestion_id, args.directory)
+                else:
+                    manifest = import_snapshot(connection, args.directory, verify=not args.no_verify)
+            finally:
+                connection.close()
+    except SnapshotError as e:
+        parser.exit(1, f"error: {e}\n")
+
+    size = sum(entry["bytes"] for entry in manifest.files.values())
+    print(
+        f"{manifest.ingestion_id}  {manifest.row_count} chunks  {manifest.embedding_dimension} dimensions  "
+        f"{manifest.embedding_model or 'unknown model'}  {size / (1 << 20):.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Metrics utility module."""
+
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry, REGISTRY
+
+__all__ = ["Counter", "Gauge", "Histogram", "MetricsRegistry", "REGISTRY"]
@@ -0,0 +1,163 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+A small, dependency-free subset of the Prometheus client: counters,
+gauges and histograms with labels, kept in a process-wide registry and
+rendered by the /metrics endpoint.
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines in the text exposition format, without HELP and TYPE."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count
+        self.values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total, count = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self.values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics. Getters return the existing metric for a name."""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self.metrics[name] = metric
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,23 @@
+"""Tracing utility module."""
+
+from .tracing import (
+    Span,
+    Trace,
+    current_span,
+    current_trace,
+    format_traceparent,
+    parse_traceparent,
+    span,
+    start_trace,
+)
+
+__all__ = [
+    "Span",
+    "Trace",
+    "current_span",
+    "current_trace",
+    "format_traceparent",
+    "parse_traceparent",
+    "span",
+    "start_trace",
+]
@@ -0,0 +1,161 @@
+"""
+Lightweight request tracing.
+
+Spans are timed with ``time.perf_counter`` and collected per trace in
+context variables, so they follow the request across ``await`` points and
+into worker threads started with a copied context. Trace and span ids use
+the W3C Trace Context format (``traceparent`` header), the propagation
+format used by OpenTelemetry, so traces can be joined with upstream and
+downstream services.
+
+Every finished span is also observed in the ``rag_stage_duration_seconds``
+histogram, labelled by span name.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.metrics import REGISTRY
+
+STAGE_DURATION = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Duration of RAG pipeline stages",
+    ("stage",),
+)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Returns (trace_id, parent_span_id) from a W3C traceparent header, or None if invalid."""
+
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def format_traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end - self.start) * 1000 if self.end is not None else None
+
+
+@dataclass(slots=True)
+class Trace:
+    trace_id: str
+    parent_id: Optional[str] = None
+    spans: List[Span] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, span: Span) -> None:
+        with self.lock:
+            self.spans.append(span)
+
+    def timings(self) -> List[Dict[str, Any]]:
+        """Finished spans in start order, with durations in milliseconds."""
+
+        with self.lock:
+            spans = sorted((s for s in self.spans if s.end is not None), key=lambda s: s.start)
+        return [
+            {
+                "name": s.name,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "duration_ms": round(s.duration_ms, 3),
+                **({"attributes": s.attributes} if s.attributes else {}),
+            }
+            for s in spans
+        ]
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_trace(traceparent: Optional[str] = None) -> Iterator[Trace]:
+    """Starts a trace, continuing the caller's trace when a valid traceparent is given."""
+
+    parsed = parse_traceparent(traceparent)
+    trace = Trace(trace_id=parsed[0], parent_id=parsed[1]) if parsed else Trace(trace_id=_new_trace_id())
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Times a block as a child of the current span.
+
+    Starts a new trace when none is active, so pipeline code run outside a
+    request (CLI, benchmarks) is traced too.
+    """
+
+    trace = _current_trace.get()
+    trace_token = None
+    if trace is None:
+        trace = Trace(trace_id=_new_trace_id())
+        trace_token = _current_trace.set(trace)
+
+    parent = _current_span.get()
+    new_span = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=_new_span_id(),
+        parent_id=parent.span_id if parent else trace.parent_id,
+        start=time.perf_counter(),
+        attributes=attributes,
+    )
+    trace.add(new_span)
+    span_token = _current_span.set(new_span)
+    try:
+        yield new_span
+    finally:
+        new_span.end = time.perf_counter()
+        _current_span.reset(span_token)
+        if trace_token is not None:
+            _current_trace.reset(trace_token)
+        STAGE_DURATION.observe(new_span.end - new_span.start, stage=name)
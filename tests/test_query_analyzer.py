@@ -0,0 +1,59 @@
+import unittest
+
+from src.ai.rag.query_analyzer import generate_sub_queries
+
+
+class GenerateSubQueriesTest(unittest.TestCase):
+
+    def assertSplits(self, cases):
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(generate_sub_queries(query), expected)
+
+    def test_single_questions_are_kept(self):
+        self.assertSplits([
+            ("What is a vector database?", ["What is a vector database?"]),
+            ("What are the pros and cons of pgvector?", ["What are the pros and cons of pgvector?"]),
+            ("Compare FastAPI and Flask", ["Compare FastAPI and Flask"]),
+            ("How do I install and configure the CLI?", ["How do I install and configure the CLI?"]),
+        ])
+
+    def test_introductory_phrases_are_not_split(self):
+        self.assertSplits([
+            ("In FastAPI, how do I add middleware?", ["In FastAPI, how do I add middleware?"]),
+            ("For pgvector, which index should I use?", ["For pgvector, which index should I use?"]),
+            ("If I use BAML, what does a retry cost?", ["If I use BAML, what does a retry cost?"]),
+        ])
+
+    def test_comma_splits_two_questions(self):
+        self.assertSplits([
+            ("What is BAML, how does it parse outputs?", ["What is BAML?", "How does it parse outputs?"]),
+            (
+                "In BAML, what is a client, and how do I configure retries?",
+                ["In BAML, what is a client?", "How do I configure retries?"],
+            ),
+        ])
+
+    def test_conjunctions_and_semicolons_split_clauses(self):
+        self.assertSplits([
+            ("What is FastAPI and why use it?", ["What is FastAPI?", "Why use it?"]),
+            ("What is a retry policy; how do I configure one?", ["What is a retry policy?", "How do I configure one?"]),
+            (
+                "Describe the ingestion pipeline and explain how retention works",
+                ["Describe the ingestion pipeline?", "Explain how retention works?"],
+            ),
+        ])
+
+    def test_multiple_questions_are_split_and_deduplicated(self):
+        self.assertSplits([
+            ("What is RAG? How does it work?", ["What is RAG?", "How does it work?"]),
+            ("What is pgvector? what is pgvector?", ["What is pgvector?"]),
+        ])
+
+    def test_empty_query(self):
+        self.assertEqual(generate_sub_queries(""), [])
+        self.assertEqual(generate_sub_queries("   "), ["   "])
+
+
+if __name__ == "__main__":
+    unittest.main()